@@ -0,0 +1,69 @@
+"""Per-sample latency of Schema.check vs CompiledSchema.check on the example schemas.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_compile
+"""
+
+import timeit
+from pathlib import Path
+
+import pandas as pd
+from PIL import Image
+
+from rdv.schema import Schema
+from rdv.feature import FloatFeature
+from rdv.extractors.structured import construct_features
+from rdv.extractors.vision import AvgIntensity, Sharpness, FixedSubpatchSimilarity
+
+DATA_PATH = Path(__file__).parents[1] / "examples/data_sample"
+
+
+def houseprices_schema():
+    data = pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+    schema = Schema(name="houseprices", features=construct_features(data.dtypes))
+    schema.build(data=data)
+    samples = [row for _, row in data.iloc[:200].iterrows()]
+    return schema, samples
+
+
+def castinginspection_schema():
+    images = [Image.open(fpath) for fpath in sorted((DATA_PATH / "castinginspection/ok_front").glob("*.jpeg"))[:50]]
+    for img in images:
+        img.load()
+    schema = Schema(
+        name="castinginspection",
+        features=[
+            FloatFeature(name="sharpness", extractor=Sharpness()),
+            FloatFeature(name="intensity", extractor=AvgIntensity()),
+            FloatFeature(name="similarity", extractor=FixedSubpatchSimilarity(patch=[0, 0, 64, 64])),
+        ],
+    )
+    schema.build(data=images)
+    return schema, images
+
+
+def per_sample_latency(check, samples, repeat=5):
+    def run():
+        for sample in samples:
+            check(sample)
+
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    return best / len(samples)
+
+
+def main():
+    for schema, samples in [houseprices_schema(), castinginspection_schema()]:
+        compiled = schema.compile()
+        before = per_sample_latency(schema.check, samples)
+        after = per_sample_latency(compiled.check, samples)
+        print(
+            f"{schema.name:>20}: {len(schema.features):3d} features | "
+            f"Schema.check {before * 1e6:9.1f} us/sample | "
+            f"CompiledSchema.check {after * 1e6:9.1f} us/sample | "
+            f"speedup {before / after:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
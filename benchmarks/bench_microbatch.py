@@ -0,0 +1,92 @@
+"""Throughput against p99 latency of DN2OutlierScorer, with and without micro-batching.
+
+Concurrent clients each check images one after another, through a schema with a single DN2 feature. If the pretrained
+MobileNet weights cannot be downloaded, randomly initialized weights are used, which have the same cost.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_microbatch
+"""
+
+import argparse
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+from torchvision import models
+
+import rdv.extractors.vision.dn2 as dn2
+from rdv.schema import Schema
+from rdv.feature import FloatFeature
+
+DATA_PATH = Path(__file__).parents[1] / "examples/data_sample"
+
+
+_mobilenet_v2 = models.mobilenet_v2
+
+
+def mobilenet_v2(pretrained=False):
+    try:
+        return _mobilenet_v2(pretrained=pretrained)
+    except Exception:
+        return _mobilenet_v2()
+
+
+def load_images():
+    fpaths = sorted((DATA_PATH / "castinginspection/ok_front").glob("*.jpeg"))[:32]
+    images = [Image.open(fpath).convert("RGB") for fpath in fpaths]
+    return images
+
+
+def run_clients(schema, images, n_clients, n_requests):
+    latencies = []
+    lock = threading.Lock()
+
+    def client(idx):
+        for req in range(n_requests):
+            img = images[(idx * n_requests + req) % len(images)]
+            start = time.perf_counter()
+            schema.check(img)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(idx,)) for idx in range(n_clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = time.perf_counter() - start
+    return len(latencies) / total, np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16, help="Number of concurrent clients.")
+    parser.add_argument("--requests", type=int, default=4, help="Number of images checked by every client.")
+    args = parser.parse_args()
+
+    dn2.models.mobilenet_v2 = mobilenet_v2
+    images = load_images()
+    extractor = dn2.DN2OutlierScorer(k=4)
+    schema = Schema(name="dn2", features=[FloatFeature(name="outlierscore", extractor=extractor)])
+    schema.build(images)
+
+    configs = [(None, None), (4, 0.005), (8, 0.01), (16, 0.02)]
+    for max_batch_size, max_latency in configs:
+        if max_batch_size is None:
+            extractor.disable_microbatching()
+            label = "no batching"
+        else:
+            extractor.enable_microbatching(max_batch_size=max_batch_size, max_latency=max_latency)
+            label = f"batch<={max_batch_size:2d}, wait<={max_latency * 1000:4.1f}ms"
+        throughput, p99 = run_clients(schema, images, n_clients=args.clients, n_requests=args.requests)
+        print(f"{label:>28}: {throughput:7.1f} images/s | p99 latency {p99 * 1000:7.1f} ms")
+    extractor.disable_microbatching()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Memory and allocations of the tags created by Schema.check on a 50-feature schema.
+
+Compares the compact, slotted `Tag` with group assigned at construction against the previous representation: a plain
+object with a per-instance `__dict__`, of which the group was set in a second pass.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_tags
+"""
+
+import timeit
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from rdv.schema import Schema
+from rdv.extractors.structured import construct_features
+from rdv.tags import Tag
+
+N_FEATURES = 50
+N_SAMPLES = 2000
+
+
+class LegacyTag:
+    def __init__(self, name, value, type, group=None):
+        self.name = name
+        self.value = value
+        self.type = type
+        self.group = group
+
+
+def legacy_tags(group, records):
+    tags = [LegacyTag(name=r["name"], value=r["value"], type=r["type"]) for r in records]
+    for tag in tags:
+        tag.group = group
+    return tags
+
+
+def compact_tags(group, records):
+    return [Tag(name=r["name"], value=r["value"], type=r["type"], group=group) for r in records]
+
+
+def measure(make_tags, group, samples):
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    results = [make_tags(group, records) for records in samples]
+    snapshot_after = tracemalloc.take_snapshot()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n_allocs = sum(stat.count_diff for stat in snapshot_after.compare_to(snapshot_before, "filename"))
+    n_tags = sum(len(tags) for tags in results)
+    return current / n_tags, n_allocs / n_tags
+
+
+def main():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.random((N_SAMPLES, N_FEATURES)), columns=[f"feat_{i}" for i in range(N_FEATURES)])
+    schema = Schema(name="bench", features=construct_features(data.dtypes))
+    schema.build(data)
+    # The tag contents every check produces, so only the tag representation itself is measured
+    samples = schema.check_batch(data)
+    group = schema.group_idfr
+
+    for label, make_tags in [("legacy Tag (__dict__, 2-pass group)", legacy_tags), ("compact Tag", compact_tags)]:
+        bytes_per_tag, allocs_per_tag = measure(make_tags, group, samples)
+        seconds = min(timeit.repeat(lambda: [make_tags(group, s) for s in samples], number=1, repeat=5))
+        print(
+            f"{label:>36}: {bytes_per_tag:6.1f} bytes/tag retained | {allocs_per_tag:5.2f} allocations/tag | "
+            f"{seconds / len(samples) * 1e6:7.1f} us/sample"
+        )
+
+
+if __name__ == "__main__":
+    main()
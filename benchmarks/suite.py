@@ -0,0 +1,414 @@
+"""Benchmark suite for building, checking, serializing and drift testing schemas, and for every extractor.
+
+Uses the houseprices and castinginspection data in examples/data_sample, and houseprices data scaled up with noise.
+Every benchmark is timed a number of times, the best time per call is compared against a stored baseline. The run
+fails when a benchmark is slower than its baseline by more than the threshold. Baselines are machine specific,
+regenerate them with --save-baseline on the machine the suite runs on.
+
+Run from the repository root:
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --filter check --repeat 10 --output results.json
+    python -m benchmarks.suite --save-baseline
+"""
+
+import argparse
+import fnmatch
+import json
+import platform
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+import rdv.extractors.vision.dn2 as dn2
+from rdv.schema import Schema
+from rdv.feature import FloatFeature
+from rdv.stats import CategoricStats, NumericStats, drift_batch
+from rdv.extractors.structured import construct_features, ElementExtractor, KMeansOutlierScorer
+from rdv.extractors.vision import AvgIntensity, Sharpness, FixedSubpatchSimilarity
+
+DATA_PATH = Path(__file__).parents[1] / "examples/data_sample"
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+SCALE = 20
+N_IMAGES = 32
+
+BENCHMARKS = {}
+
+
+def benchmark(name, number=1):
+    """Registers a benchmark. The decorated function sets it up and returns the callable to time, `number` calls of it
+    are timed together."""
+
+    def decorator(setup):
+        BENCHMARKS[name] = (setup, number)
+        return setup
+
+    return decorator
+
+
+"""Data"""
+
+_cache = {}
+
+
+def cached(func):
+    def wrapper():
+        if func.__name__ not in _cache:
+            _cache[func.__name__] = func()
+        return _cache[func.__name__]
+
+    return wrapper
+
+
+@cached
+def houseprices():
+    return pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+
+
+@cached
+def houseprices_scaled():
+    """The houseprices data repeated SCALE times, with noise on the numeric columns."""
+    data = houseprices()
+    scaled = pd.concat([data] * SCALE, ignore_index=True)
+    rng = np.random.default_rng(0)
+    for col in scaled.select_dtypes("float").columns:
+        scaled[col] = scaled[col] * rng.normal(1, 0.05, size=len(scaled))
+    return scaled
+
+
+@cached
+def images():
+    fpaths = sorted((DATA_PATH / "castinginspection/ok_front").glob("*.jpeg"))[:N_IMAGES]
+    images = [Image.open(fpath).convert("RGB") for fpath in fpaths]
+    return images
+
+
+@cached
+def houseprices_schema():
+    schema = Schema(name="houseprices", features=construct_features(houseprices().dtypes))
+    schema.build(data=houseprices())
+    return schema
+
+
+@cached
+def vision_schema():
+    schema = Schema(
+        name="castinginspection",
+        features=[
+            FloatFeature(name="sharpness", extractor=Sharpness()),
+            FloatFeature(name="intensity", extractor=AvgIntensity()),
+            FloatFeature(name="similarity", extractor=FixedSubpatchSimilarity(patch=[0, 0, 64, 64])),
+        ],
+    )
+    schema.build(data=images())
+    return schema
+
+
+_mobilenet_v2 = dn2.models.mobilenet_v2
+
+
+def mobilenet_v2(pretrained=False):
+    # Falls back on random weights when the pretrained ones cannot be downloaded, they have the same cost
+    try:
+        return _mobilenet_v2(pretrained=pretrained)
+    except Exception:
+        return _mobilenet_v2()
+
+
+@cached
+def dn2_scorer():
+    dn2.models.mobilenet_v2 = mobilenet_v2
+    extractor = dn2.DN2OutlierScorer(k=4)
+    extractor.build(images())
+    return extractor
+
+
+"""Schema benchmarks"""
+
+
+@benchmark("build/houseprices")
+def bench_build_houseprices():
+    data = houseprices()
+    return lambda: Schema(features=construct_features(data.dtypes)).build(data=data)
+
+
+@benchmark("build/houseprices-scaled")
+def bench_build_houseprices_scaled():
+    data = houseprices_scaled()
+    return lambda: Schema(features=construct_features(data.dtypes)).build(data=data)
+
+
+@benchmark("build/houseprices-from_dataframe")
+def bench_build_houseprices_from_dataframe():
+    data = houseprices()
+    return lambda: Schema.from_dataframe(data)
+
+
+@benchmark("build/castinginspection")
+def bench_build_vision():
+    data = images()
+
+    def run():
+        schema = Schema(
+            features=[
+                FloatFeature(name="sharpness", extractor=Sharpness()),
+                FloatFeature(name="intensity", extractor=AvgIntensity()),
+                FloatFeature(name="similarity", extractor=FixedSubpatchSimilarity(patch=[0, 0, 64, 64])),
+            ]
+        )
+        schema.build(data=data)
+
+    return run
+
+
+@benchmark("check/houseprices", number=100)
+def bench_check_houseprices():
+    schema = houseprices_schema()
+    row = houseprices().iloc[0]
+    return lambda: schema.check(row)
+
+
+@benchmark("check/houseprices-compiled", number=100)
+def bench_check_houseprices_compiled():
+    compiled = houseprices_schema().compile()
+    row = houseprices().iloc[0]
+    return lambda: compiled.check(row)
+
+
+@benchmark("check/castinginspection", number=10)
+def bench_check_vision():
+    schema = vision_schema()
+    img = images()[0]
+    return lambda: schema.check(img)
+
+
+@benchmark("check_batch/houseprices")
+def bench_check_batch_houseprices():
+    schema = houseprices_schema()
+    data = houseprices()
+    return lambda: schema.check_batch(data)
+
+
+@benchmark("check_batch/houseprices-scaled")
+def bench_check_batch_houseprices_scaled():
+    schema = houseprices_schema()
+    data = houseprices_scaled()
+    return lambda: schema.check_batch(data)
+
+
+@benchmark("check_batch/castinginspection")
+def bench_check_batch_vision():
+    schema = vision_schema()
+    data = images()
+    return lambda: schema.check_batch(data)
+
+
+@benchmark("serialization/save", number=10)
+def bench_save():
+    schema = houseprices_schema()
+    fpath = Path(tempfile.mkdtemp()) / "schema.json"
+    return lambda: schema.save(fpath)
+
+
+@benchmark("serialization/load", number=10)
+def bench_load():
+    fpath = Path(tempfile.mkdtemp()) / "schema.json"
+    houseprices_schema().save(fpath)
+    return lambda: Schema.load(fpath)
+
+
+"""Drift benchmarks"""
+
+
+@benchmark("drift/numeric", number=100)
+def bench_drift_numeric():
+    data = houseprices_scaled()["LotArea"].astype(float)
+    reference, other = NumericStats(), NumericStats()
+    reference.build(data.iloc[: len(data) // 2])
+    other.build(data.iloc[len(data) // 2 :])
+    return lambda: reference.test_drift(other)
+
+
+@benchmark("drift/categoric", number=100)
+def bench_drift_categoric():
+    data = houseprices_scaled()["Neighborhood"]
+    reference, other = CategoricStats(), CategoricStats()
+    reference.build(data.iloc[: len(data) // 2])
+    other.build(data.iloc[len(data) // 2 :])
+    return lambda: reference.test_drift(other)
+
+
+@benchmark("drift/houseprices-batch", number=100)
+def bench_drift_houseprices_batch():
+    data = houseprices_scaled()
+    reference = Schema.from_dataframe(data.iloc[: len(data) // 2])
+    other = Schema.from_dataframe(data.iloc[len(data) // 2 :])
+    pairs = [(feat.stats, other.features[name].stats) for name, feat in reference.features.items()]
+    return lambda: drift_batch(pairs)
+
+
+@benchmark("drift/houseprices-report-10", number=5)
+def bench_drift_houseprices_report():
+    data = houseprices_scaled()
+    reference = Schema.from_dataframe(data.iloc[: len(data) // 2])
+    candidates = [Schema.from_dataframe(data.sample(len(data) // 2, random_state=seed)) for seed in range(10)]
+    return lambda: reference.drift_report(candidates)
+
+
+"""Sampling benchmarks, drawing the histogram values of a feature"""
+
+
+@benchmark("sample/numeric", number=1000)
+def bench_sample_numeric():
+    stats = NumericStats()
+    stats.build(houseprices_scaled()["LotArea"].astype(float))
+    return lambda: stats.sample(n=1000)
+
+
+@benchmark("sample/categoric", number=1000)
+def bench_sample_categoric():
+    stats = CategoricStats()
+    stats.build(houseprices_scaled()["Neighborhood"])
+    return lambda: stats.sample(n=1000)
+
+
+"""Extractor benchmarks, extracting the feature of one sample"""
+
+
+@benchmark("extractor/ElementExtractor", number=1000)
+def bench_element():
+    extractor = ElementExtractor(element="LotArea")
+    row = houseprices().iloc[0]
+    return lambda: extractor.extract_feature(row)
+
+
+@benchmark("extractor/KMeansOutlierScorer", number=100)
+def bench_kmeans():
+    data = houseprices_scaled().select_dtypes("number").fillna(0).values
+    extractor = KMeansOutlierScorer(k=16)
+    extractor.build(data[:5000])
+    return lambda: extractor.extract_feature(data[0])
+
+
+@benchmark("extractor/Sharpness", number=10)
+def bench_sharpness():
+    extractor = Sharpness()
+    img = images()[0]
+    return lambda: extractor.extract_feature(img)
+
+
+@benchmark("extractor/AvgIntensity", number=10)
+def bench_intensity():
+    extractor = AvgIntensity()
+    img = images()[0]
+    return lambda: extractor.extract_feature(img)
+
+
+@benchmark("extractor/FixedSubpatchSimilarity", number=10)
+def bench_similarity():
+    extractor = FixedSubpatchSimilarity(patch=[0, 0, 64, 64])
+    extractor.build(images())
+    img = images()[0]
+    return lambda: extractor.extract_feature(img)
+
+
+@benchmark("extractor/DN2OutlierScorer", number=10)
+def bench_dn2():
+    extractor = dn2_scorer()
+    img = images()[0]
+    return lambda: extractor.extract_feature(img)
+
+
+"""Runner"""
+
+
+def run(pattern="*", repeat=5):
+    results = {}
+    for name, (setup, number) in BENCHMARKS.items():
+        if not fnmatch.fnmatch(name, pattern) and pattern not in name:
+            continue
+        func = setup()
+        func()  # Warm up
+        times = np.array(timeit.repeat(func, number=number, repeat=repeat)) / number
+        results[name] = {
+            "min": float(times.min()),
+            "median": float(np.median(times)),
+            "number": number,
+            "repeat": repeat,
+        }
+        print(f"{name:>40}: {times.min() * 1e3:10.3f} ms/call (median {np.median(times) * 1e3:10.3f} ms)")
+    return results
+
+
+def environment():
+    import rdv
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "rdv": getattr(rdv, "__version__", None),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Returns the benchmarks that are slower than their baseline by more than `threshold` (relative)."""
+    regressions = {}
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["min"] / baseline[name]["min"]
+        if ratio > 1 + threshold:
+            regressions[name] = ratio
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="*", help="Only run the benchmarks matching this pattern.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of times every benchmark is timed.")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="The baseline to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown against the baseline.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline.")
+    args = parser.parse_args()
+
+    results = run(pattern=args.filter, repeat=args.repeat)
+    report = {"environment": environment(), "results": results}
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+
+    if args.save_baseline:
+        baseline = {}
+        if args.baseline.exists():
+            with open(args.baseline, "r") as f:
+                baseline = json.load(f)["results"]
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump({"environment": environment(), "results": baseline}, f, indent=4, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, nothing to compare against")
+        return
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, threshold=args.threshold)
+    for name, ratio in regressions.items():
+        print(f"REGRESSION {name}: {ratio:.2f}x the baseline time")
+    if len(regressions) > 0:
+        sys.exit(1)
+    print(f"No regressions beyond {args.threshold:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Groups items submitted from many threads or coroutines into batches, to process them with one call of
+    `batch_fn`. A batch is processed as soon as it holds `max_batch_size` items, or `max_latency` seconds after its
+    first item was submitted, whichever comes first.
+
+    Parameters
+    ----------
+    batch_fn : callable
+        Processes a list of items, and returns a list with one result per item, in the same order.
+    max_batch_size : int, optional
+        The maximum number of items in a batch, by default 32
+    max_latency : float, optional
+        The maximum time in seconds an item waits for its batch to fill up, by default 0.01
+    """
+
+    def __init__(self, batch_fn, max_batch_size=32, max_latency=0.01):
+        if not (isinstance(max_batch_size, int) and max_batch_size > 0):
+            raise ValueError(f"max_batch_size must be an int > 0, not {max_batch_size}")
+        if max_latency < 0:
+            raise ValueError(f"max_latency must be >= 0, not {max_latency}")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.n_batches = 0
+        self.n_items = 0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        # Orders submits against close, so no item is queued after the stop sentinel
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="rdv-microbatcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        """Queues an item for processing.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            Resolves to the result for this item.
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Cannot submit to a closed MicroBatcher")
+            self._queue.put((item, future))
+        return future
+
+    async def asubmit(self, item):
+        """Queues an item for processing and waits for its result without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(item))
+
+    def close(self):
+        """Processes the items that are still queued, and stops the worker thread. Submitting afterwards raises a
+        RuntimeError."""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+        self._worker.join()
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                # Closing, handle this batch first
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        try:
+            self._process()
+        finally:
+            # Nothing is processed anymore, do not leave anyone waiting
+            with self._lock:
+                self._closed = True
+            while True:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is not None:
+                    entry[1].set_exception(RuntimeError("The MicroBatcher was closed before processing this item"))
+
+    def _process(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise ValueError(f"batch_fn returned {len(results)} results for {len(items)} items")
+            except Exception as exc:
+                for future in futures:
+                    future.set_exception(exc)
+            else:
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+            self.n_batches += 1
+            self.n_items += len(items)
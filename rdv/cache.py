@@ -0,0 +1,118 @@
+"""On-disk cache of extracted feature values, to rebuild schemas on the same data without extracting every feature again.
+
+An entry is keyed by a fingerprint of the data and the configuration of the extractor: its class and `to_jcr()` state
+without the parts learned by `build`, like clusters. It holds the state of the extractor after building and the values it
+extracted, so a cache hit skips both building the extractor and extracting its feature. Adding, dropping or
+reconfiguring a feature only recomputes the features whose extractor changed, also when rebuilding a built schema. The least recently used entries are evicted once the cache grows beyond its size.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+DEFAULT_MAX_SIZE = 2**30
+
+
+def fingerprint_data(data):
+    """Returns a hash of the content of a DataFrame, an array or an iterable of data instances."""
+    digest = hashlib.blake2b(digest_size=20)
+    if isinstance(data, pd.DataFrame):
+        digest.update(pickle.dumps((list(data.columns), [str(dtype) for dtype in data.dtypes])))
+        digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    elif isinstance(data, np.ndarray):
+        _update_array(digest, data)
+    else:
+        for instance in data:
+            if isinstance(instance, Image.Image):
+                digest.update(f"{instance.mode}{instance.size}".encode())
+                digest.update(instance.tobytes())
+            elif isinstance(instance, np.ndarray):
+                _update_array(digest, instance)
+            else:
+                digest.update(pickle.dumps(instance))
+    return digest.hexdigest()
+
+
+def _update_array(digest, array):
+    digest.update(f"{array.dtype}{array.shape}".encode())
+    if array.dtype == object:
+        digest.update(pickle.dumps(array.tolist()))
+    else:
+        digest.update(np.ascontiguousarray(array).tobytes())
+
+
+class FeatureCache:
+    """Cache of extracted feature values in a directory, see the module.
+
+    Parameters
+    ----------
+    path : str or Path
+        The directory of the cache, created if it does not exist. Caches in the same directory share their entries.
+    max_size : int, optional
+        The maximum size of the cache in bytes, by default 1 GiB
+    """
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+
+    def key(self, data_fingerprint, extractor):
+        # Built and unbuilt extractors share their entries, build overwrites the learned state anyway
+        fingerprint = extractor.config_fingerprint()
+        return hashlib.blake2b(f"{data_fingerprint}:{fingerprint}".encode(), digest_size=20).hexdigest()
+
+    def get(self, key):
+        """Returns the cached extractor state and values for `key`, or None if they are not cached."""
+        fpath = self.path / f"{key}.pkl"
+        try:
+            with open(fpath, "rb") as f:
+                entry = pickle.load(f)
+            # Mark as recently used
+            os.utime(fpath)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        return entry["extractor_state"], entry["values"]
+
+    def put(self, key, extractor_state, values):
+        values = values.tolist() if isinstance(values, (np.ndarray, pd.Series)) else list(values)
+        # Write to a temporary file first, so concurrent readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump({"extractor_state": extractor_state, "values": values}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path / f"{key}.pkl")
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits in its maximum size."""
+        entries = []
+        for fpath in self.path.glob("*.pkl"):
+            try:
+                stat = fpath.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, fpath))
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, fpath in sorted(entries):
+            if size <= self.max_size:
+                break
+            fpath.unlink(missing_ok=True)
+            size -= entry_size
+
+    def clear(self):
+        for fpath in self.path.glob("*.pkl"):
+            fpath.unlink(missing_ok=True)
+
+    @property
+    def size(self):
+        """The size of the cache in bytes."""
+        return sum(fpath.stat().st_size for fpath in self.path.glob("*.pkl"))
+
+    def __len__(self):
+        return sum(1 for _ in self.path.glob("*.pkl"))
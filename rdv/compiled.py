@@ -0,0 +1,143 @@
+import sys
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from rdv.globals import SchemaStateException
+from rdv.extractors import HEAVY_COST
+from rdv.extractors.shared import sample_cache, shared
+from rdv.feature import CategoricFeature, FloatFeature, IntFeature
+from rdv.stats import CategoricStats, NumericStats
+from rdv.tags import Tag, SCHEMA_ERROR, SCHEMA_FEATURE
+
+NUMERIC = 0
+CATEGORIC = 1
+GENERIC = 2
+
+# The feature2tag and check_invalid methods that the compiled checks reproduce, for every kind of check
+COMPILED_CHECKS = {
+    NUMERIC: {(cls.feature2tag, cls.check_invalid) for cls in (FloatFeature, IntFeature)},
+    CATEGORIC: {(CategoricFeature.feature2tag, CategoricFeature.check_invalid)},
+}
+
+
+def check_kind(feature):
+    """Returns how a compiled schema checks a feature. Features that override `feature2tag` or `check_invalid` are
+    checked with their own `check`."""
+    if isinstance(feature.stats, NumericStats):
+        kind = NUMERIC
+    elif isinstance(feature.stats, CategoricStats):
+        kind = CATEGORIC
+    else:
+        return GENERIC
+    if (type(feature).feature2tag, type(feature).check_invalid) not in COMPILED_CHECKS[kind]:
+        return GENERIC
+    return kind
+
+
+class CompiledSchema:
+    """A frozen, flat validator for a built `Schema`, meant for the serving hot path.
+
+    Compiling resolves everything that does not change between checks once: the extractor callables, the stats bounds
+    and domains, the tag names and the schema group. Checking data with a compiled schema gives the same result as
+    `Schema.check`, but without walking the schema objects for every sample. Changes made to the schema after compiling
+    (rebuilding, dropping features, ...) are not reflected, compile the schema again in that case. The checks of a
+    compiled schema are not reported to `rdv.instrumentation`, profile the schema itself instead.
+    """
+
+    def __init__(self, schema):
+        if not schema.is_built():
+            raise SchemaStateException(f"Cannot compile an unbuilt schema. Check whether all features are built.")
+        self.name = schema.name
+        self.version = schema.version
+        self.group = sys.intern(schema.group_idfr)
+
+        features = list(schema.features.values())
+        self.names = tuple(sys.intern(feat.name) for feat in features)
+        self.mins = np.array([getattr(feat.stats, "min", np.nan) for feat in features], dtype=float)
+        self.maxs = np.array([getattr(feat.stats, "max", np.nan) for feat in features], dtype=float)
+        self.domains = tuple(
+            frozenset(feat.stats.domain_counts) if isinstance(feat.stats, CategoricStats) else None for feat in features
+        )
+
+        # Features with identically configured extractors share one extractor, so its feature is extracted only once
+        extractors = {}
+        for feat in features:
+            extractors.setdefault(feat.extractor.share_key(), feat.extractor)
+        n_heavy = sum(feat.cost >= HEAVY_COST for feat in features)
+        # Sharing comes at a small cost per check, only do it when there is something to share
+        self.share = len(extractors) < len(features) or n_heavy > 1
+
+        plan = []
+        for idx, feat in enumerate(features):
+            kind = check_kind(feat)
+            if kind == GENERIC:
+                # Unknown or customized feature type, fall back on its own check
+                extract = feat.check
+            else:
+                extract = extractors[feat.extractor.share_key()].extract_feature
+            plan.append(
+                (
+                    kind,
+                    extract,
+                    self.names[idx],
+                    sys.intern(feat.errname),
+                    float(self.mins[idx]),
+                    float(self.maxs[idx]),
+                    self.domains[idx],
+                )
+            )
+        self._plan = tuple(plan)
+
+    def __str__(self):
+        return f'CompiledSchema(name="{self.name}", version="{self.version}")'
+
+    def check(self, data, convert_json=True):
+        if self.share:
+            with sample_cache():
+                return self._check(data, convert_json=convert_json, extract=partial(shared, data))
+        return self._check(data, convert_json=convert_json, extract=None)
+
+    def _check(self, data, convert_json, extract):
+        group = self.group
+        if convert_json:
+
+            def make_tag(name, value, type):
+                return {"type": type, "name": name, "value": value, "group": group}
+
+        else:
+
+            def make_tag(name, value, type):
+                return Tag(name=name, value=value, type=type, group=group)
+
+        tags = []
+        for kind, extract_feature, name, errname, lo, hi, domain in self._plan:
+            if kind == GENERIC:
+                for tag in extract_feature(data, group=group):
+                    tags.append(tag.to_jcr() if convert_json else tag)
+                continue
+
+            feature = extract_feature(data) if extract is None else extract(extract_feature)
+            err = None
+            if feature is None:
+                err = "Value None"
+            elif kind == NUMERIC:
+                if feature != feature:
+                    err = "Value NaN"
+                else:
+                    tags.append(make_tag(name, float(feature), SCHEMA_FEATURE))
+                    if feature > hi:
+                        err = "Value > max"
+                    elif feature < lo:
+                        err = "Value < min"
+            elif feature.__class__ is not str and pd.isnull(feature):
+                err = "Value NaN"
+            else:
+                tags.append(make_tag(name, feature, SCHEMA_FEATURE))
+                if feature not in domain:
+                    err = "Domain Error"
+
+            if err is not None:
+                tags.append(make_tag(errname, err, SCHEMA_ERROR))
+        return tags
@@ -1,6 +1,10 @@
+import logging
+
 from jupyter_dash import JupyterDash
 import dash
 
+logger = logging.getLogger(__name__)
+
 
 def isnotebook():
     try:
@@ -18,8 +22,8 @@ def isnotebook():
 def get_dash(mode="inline"):
     isnb = isnotebook()
     if isnb:
-        print("Using JupyterDash")
+        logger.info("Using JupyterDash")
         return JupyterDash, {"mode": mode}
     else:
-        print("Using standard Dash")
+        logger.info("Using standard Dash")
         return dash.Dash, {}
@@ -0,0 +1,106 @@
+"""Deterministic drift tests between feature stats built on two datasets, computed from the stored stats alone.
+
+Numeric features are compared with the two-sample Kolmogorov-Smirnov test. The stored CDF of a feature is linear between
+its percentiles, so the largest difference between two CDFs is attained at one of the percentiles of either side:
+evaluating both CDFs on the merged percentile grid gives the KS distance exactly. The percentiles only resolve the
+real CDFs to one percentile step though, up to a full step where values are tied, while the critical distance of the
+asymptotic test for the real sample sizes shrinks with the square root of the sample size. For large samples the grid error alone would be
+significant, so the p-value is the one of the KS distance minus one percentile step, the smallest distance between the
+real CDFs that the percentiles are consistent with. This is conservative, small drifts in samples of a few thousand
+values get larger p-values than with the raw values.
+
+Categoric features are compared with Pearson's chi-squared test of homogeneity, on the counts recovered from the domain
+frequencies and the real numbers of valid values.
+
+Every test takes the stats of many features at once, as 2-D arrays with one row per feature, so testing all features of
+a schema is a handful of array operations. The results do not depend on any random sampling.
+"""
+
+import numpy as np
+from scipy.stats import chi2, kstwo
+
+
+def cdf_limits(percentiles, x):
+    """Left and right limits of the CDFs given by `percentiles` at `x`.
+
+    Parameters
+    ----------
+    percentiles : np.ndarray
+        The 0th to 100th percentile of every feature, shape (n_features, 101).
+    x : np.ndarray
+        The points to evaluate every CDF at, shape (n_features, n_points).
+
+    Returns
+    -------
+    left, right : np.ndarray
+        The limits of the CDFs from the left and from the right, shape (n_features, n_points). They differ where
+        percentiles are tied, the CDF jumps there.
+    """
+    # The percentiles below x are [:lo], the ones equal to it [lo:hi]
+    lo = (percentiles[:, None, :] < x[:, :, None]).sum(axis=-1)
+    hi = (percentiles[:, None, :] <= x[:, :, None]).sum(axis=-1)
+    below = np.take_along_axis(percentiles, np.clip(lo - 1, 0, 100), axis=1)
+    above = np.take_along_axis(percentiles, np.clip(lo, 0, 100), axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        between = (lo - 1 + (x - below) / (above - below)) / 100
+    inside = (lo == hi) & (lo > 0) & (lo <= 100)
+    left = np.where(inside, between, np.minimum(lo, 100) / 100)
+    right = np.where(inside, between, np.maximum(hi - 1, 0) / 100)
+    right = np.where(hi == 0, 0.0, np.where(hi > 100, 1.0, right))
+    return left, right
+
+
+def ks_drift(percentiles_a, percentiles_b, n_a, n_b):
+    """Two-sample Kolmogorov-Smirnov tests between features, from their percentiles. See the module.
+
+    Parameters
+    ----------
+    percentiles_a, percentiles_b : array-like
+        The 0th to 100th percentile of every feature on both sides, shape (n_features, 101).
+    n_a, n_b : array-like
+        The number of valid values every feature was built on, on both sides.
+
+    Returns
+    -------
+    statistic, pvalue : np.ndarray
+        The KS distance between the stored CDFs and its p-value for every feature.
+    """
+    percentiles_a = np.atleast_2d(np.asarray(percentiles_a, dtype=float))
+    percentiles_b = np.atleast_2d(np.asarray(percentiles_b, dtype=float))
+    grid = np.concatenate([percentiles_a, percentiles_b], axis=1)
+    left_a, right_a = cdf_limits(percentiles_a, grid)
+    left_b, right_b = cdf_limits(percentiles_b, grid)
+    statistic = np.maximum(np.abs(left_a - left_b).max(axis=1), np.abs(right_a - right_b).max(axis=1))
+    n_a, n_b = np.asarray(n_a, dtype=float), np.asarray(n_b, dtype=float)
+    n = np.maximum(np.round(n_a * n_b / (n_a + n_b)), 1)
+    resolution = 1 / (percentiles_a.shape[1] - 1)
+    pvalue = np.clip(kstwo.sf(np.maximum(statistic - resolution, 0), n), 0, 1)
+    return statistic, pvalue
+
+
+def chi2_drift(counts_a, counts_b):
+    """Chi-squared tests of homogeneity between features, from their domain counts. See the module.
+
+    Parameters
+    ----------
+    counts_a, counts_b : array-like
+        The count of every domain value of every feature on both sides, shape (n_features, n_values). The domain values
+        are aligned between both sides, features with a smaller domain are padded with zeros.
+
+    Returns
+    -------
+    statistic, pvalue : np.ndarray
+        The chi-squared statistic and its p-value for every feature.
+    """
+    observed = np.stack([np.atleast_2d(counts_a), np.atleast_2d(counts_b)], axis=1).astype(float)
+    rows = observed.sum(axis=2, keepdims=True)
+    cols = observed.sum(axis=1, keepdims=True)
+    total = np.maximum(rows.sum(axis=1, keepdims=True), np.finfo(float).tiny)
+    expected = rows * cols / total
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cells = np.where(expected > 0, (observed - expected) ** 2 / expected, 0.0)
+    statistic = cells.sum(axis=(1, 2))
+    # Only domain values that occur on either side count
+    dof = (cols[:, 0, :] > 0).sum(axis=1) - 1
+    pvalue = np.where(dof > 0, chi2.sf(statistic, np.maximum(dof, 1)), 1.0)
+    return statistic, pvalue
@@ -1,12 +1,38 @@
+import json
 from abc import ABC, abstractmethod
 
+import pandas as pd
+
 from rdv.globals import (
     Buildable,
     Serializable,
 )
+from rdv.extractors.shared import shared
+
+# Extractors with a cost of at least HEAVY_COST are considered expensive, and are offloaded to an executor when checking
+# data asynchronously.
+HEAVY_COST = 10
+
+
+def dataframe_rows(data):
+    """Returns the rows of a DataFrame, as Series."""
+    return [row for _, row in data.iterrows()]
 
 
 class FeatureExtractor(Serializable, Buildable, ABC):
+    # Relative cost hint of extracting a feature from one data instance. Override this in your extractor.
+    cost = 1
+    # Whether `to_jcr()` captures everything that affects the extracted features, so that extractors with the same
+    # fingerprint extract the same features and can share them. Set this in your extractor only if it does.
+    shareable = False
+    # Keys of `to_jcr()` that are learned from the data by `build`, rather than configured.
+    _built_attrs = []
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # Assigning an attribute, directly or through a property, may change the state
+        self.__dict__.pop("_fingerprint", None)
+
     @abstractmethod
     def extract_feature(self, data):
         """Extracts a feature from a data instance.
@@ -19,6 +45,48 @@ class FeatureExtractor(Serializable, Buildable, ABC):
         """
         raise NotImplementedError
 
+    def extract_batch(self, data):
+        """Extracts a feature from every data instance in a batch. By default, this calls `extract_feature` for every instance, override this if your extractor can be vectorized.
+
+        Parameters
+        ----------
+        data : pd.DataFrame, np.ndarray or Iterable
+            The batch of data instances. DataFrames and arrays are iterated over row by row.
+
+        Returns
+        -------
+        features : list or array-like
+            One feature per data instance, in the same order as the batch.
+        """
+        if isinstance(data, pd.DataFrame):
+            # Split once per batch for all extractors, when a sample cache is active
+            data = shared(data, dataframe_rows)
+        return [self.extract_feature(instance) for instance in data]
+
+    def fingerprint(self):
+        """Returns a string that is the same for extractors of the same class and with the same state, i.e. extractors
+        that will extract the same feature from the same data. It is computed once until an attribute of the extractor
+        is assigned, changes made in place, like to an array of the extractor, are not noticed."""
+        fingerprint = self.__dict__.get("_fingerprint")
+        if fingerprint is None:
+            fingerprint = f"{self.class2str()}:{json.dumps(self.to_jcr(), sort_keys=True)}"
+            self.__dict__["_fingerprint"] = fingerprint
+        return fingerprint
+
+    def share_key(self):
+        """Returns a key that is the same for extractors whose extracted features can be shared: the fingerprint of
+        `shareable` extractors, the extractor itself otherwise."""
+        return self.fingerprint() if self.shareable else self
+
+    def config_jcr(self):
+        """Returns the `to_jcr()` state without the parts learned by `build`, i.e. the configuration of the extractor."""
+        return {key: value for key, value in self.to_jcr().items() if key not in self._built_attrs}
+
+    def config_fingerprint(self):
+        """Returns a string that is the same for extractors of the same class and configuration, built or not, i.e.
+        extractors that will extract the same feature from the same data once built on the same data."""
+        return f"{self.class2str()}:{json.dumps(self.config_jcr(), sort_keys=True)}"
+
     def __str__(self):
         return self.__class__.__name__
 
@@ -27,6 +95,9 @@ class FeatureExtractor(Serializable, Buildable, ABC):
 
 
 class NoneExtractor(FeatureExtractor):
+    cost = 0
+    shareable = True
+
     def to_jcr(self):
         data = {}
         return data
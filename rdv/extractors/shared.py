@@ -0,0 +1,77 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_active_cache = ContextVar("rdv_sample_cache", default=None)
+
+
+class SampleCache:
+    """Memoizes intermediate representations of data instances, like a grayscale version of an image, so they are
+    computed only once when several extractors need them. Use the `sample_cache` context manager to activate a cache.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, data, func, args=(), key=None):
+        key = (id(data), func if key is None else key, args)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _CacheEntry(data)
+        # Compute outside of the cache lock, so features running in parallel only wait on what they need themselves
+        with entry.lock:
+            if not entry.done:
+                entry.value = func(data, *args)
+                entry.done = True
+        return entry.value
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _CacheEntry:
+    __slots__ = ("data", "value", "done", "lock")
+
+    def __init__(self, data):
+        # Keep a reference to the data, so its id cannot be reused while the cache is alive
+        self.data = data
+        self.value = None
+        self.done = False
+        self.lock = threading.Lock()
+
+
+@contextmanager
+def sample_cache():
+    """Activates a `SampleCache` for the current context. Intermediate representations requested through `shared` are
+    computed once per data instance until the context exits."""
+    cache = SampleCache()
+    token = _active_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _active_cache.reset(token)
+
+
+def shared(data, func, *args, key=None):
+    """Returns `func(data, *args)`. When a sample cache is active, the result is computed only once per data instance,
+    and shared with every other extractor asking for it.
+
+    Parameters
+    ----------
+    data : any
+        The data instance.
+    func : callable
+        Computes the intermediate representation. Must be a module level function or a bound method, since it is used
+        as cache key.
+    args : hashable
+        Extra arguments of `func`, also part of the cache key.
+    key : hashable, optional
+        Identifies `func` in the cache key instead, for functions that compute the same thing while not being equal,
+        like the bound methods of two identically configured extractors.
+    """
+    cache = _active_cache.get()
+    if cache is None:
+        return func(data, *args)
+    return cache.get(data, func, args, key=key)
@@ -1,5 +1,6 @@
 from PIL import Image
 import numpy as np
+import pandas as pd
 
 
 from rdv.extractors import FeatureExtractor
@@ -12,6 +13,9 @@ class ElementExtractor(FeatureExtractor):
     Extract one element from a vector
     """
 
+    cost = 0
+    shareable = True
+
     def __init__(self, element):
         self.element = element
 
@@ -30,6 +34,13 @@ class ElementExtractor(FeatureExtractor):
     def extract_feature(self, data):
         return data[self.element]
 
+    def extract_batch(self, data):
+        if isinstance(data, pd.DataFrame):
+            return data[self.element].values
+        elif isinstance(data, np.ndarray):
+            return data[:, self.element]
+        return super().extract_batch(data)
+
     """Serializable interface """
 
     def to_jcr(self):
@@ -9,6 +9,9 @@ from rdv.extractors import FeatureExtractor
 
 
 class KMeansOutlierScorer(FeatureExtractor):
+    cost = 5
+    shareable = True
+    _built_attrs = ["clusters"]
 
     dist_choices = {"euclidean": euclidean_distances, "cosine": cosine_distances}
 
@@ -84,6 +87,13 @@ class KMeansOutlierScorer(FeatureExtractor):
         pairwise_dist = self.dist(data, self.clusters)
         return float(sum_2closest(pairwise_dist))
 
+    def extract_batch(self, data):
+        data = np.asarray(data)
+        if data.ndim != 2 or data.shape[1] != self.dim:
+            raise ValueError(f"data must be of shape (n, {self.dim}), not {data.shape}")
+        pairwise_dist = self.dist(data, self.clusters)
+        return np.sort(pairwise_dist, axis=1)[:, :2].sum(axis=1).tolist()
+
     """Buildable interface"""
 
     def build(self, data):
@@ -99,8 +109,8 @@ class KMeansOutlierScorer(FeatureExtractor):
     """Serializable interface"""
 
     def to_jcr(self):
-        b64 = base64.b64encode(self.clusters).decode()
-        shape = self.clusters.shape
+        # Unbuilt extractors have no clusters yet
+        b64 = base64.b64encode(self.clusters).decode() if self.clusters is not None else None
         diststr = [k for k, v in self.dist_choices.items() if v == self.dist][0]
         data = {"clusters": b64, "k": self.k, "dist": diststr}
         return data
@@ -110,5 +120,7 @@ class KMeansOutlierScorer(FeatureExtractor):
         k = jcr["k"]
         b64 = jcr["clusters"]
         dist = jcr["dist"]
-        clusters = np.frombuffer(base64.decodebytes(b64.encode()), dtype=np.float64).reshape((k, -1))
+        clusters = None
+        if b64 is not None:
+            clusters = np.frombuffer(base64.decodebytes(b64.encode()), dtype=np.float64).reshape((k, -1))
         return cls(k=k, clusters=clusters, dist=dist)
@@ -6,7 +6,10 @@ from torch.utils.data import DataLoader, Dataset
 from torchvision import transforms
 from PIL import Image
 
+from rdv.batching import MicroBatcher
 from rdv.extractors.structured.kmeans import KMeansOutlierScorer
+from rdv.extractors.shared import shared
+from rdv.extractors.vision.preprocessing import IMAGENET_MEAN, IMAGENET_STD, normalized_tensor, resized_tensor
 
 # Loosely based on "Deep Nearest Neighbor Anomaly Detection": https://arxiv.org/abs/2002.10445
 
@@ -30,13 +33,18 @@ class ImageDataset(Dataset):
 
 
 class DN2OutlierScorer(KMeansOutlierScorer):
+    cost = 100
+    # The maximum number of images in a forward pass of `extract_batch`, bounds its memory
+    max_batch_size = 32
+
     def __init__(self, k=16, size=None, clusters=None, dist="euclidean"):
         super().__init__(k=k, clusters=clusters, dist=dist)
         self.mobilenet = models.mobilenet_v2(pretrained=True).eval()
+        self._batcher = None
         self.size = size
         tfs = [
             transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+            transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD),
         ]
         if size is not None:
             tfs.append(
@@ -47,10 +55,71 @@ class DN2OutlierScorer(KMeansOutlierScorer):
     def extract_feature(self, data):
         if not isinstance(data, Image.Image):
             raise ValueError(f"data must be of type PIL.Image.Image, not {data.shape}")
-        batchtf = self.tfs(data)[None, :]
+        if self._batcher is not None:
+            return self._batcher.submit(data).result()
+        batchtf = self._tensor(data)[None, :]
         feats = self.mobilenet(batchtf).detach().numpy()
         return super().extract_feature(data=feats)
 
+    def _tensor(self, img):
+        if self.size is None:
+            return shared(img, normalized_tensor)
+        size = tuple(self.size) if isinstance(self.size, list) else self.size
+        return shared(img, resized_tensor, size)
+
+    def extract_batch(self, data):
+        """Extracts the outlier scores of a list of images with batched forward passes. Images of the same shape are
+        scored together, in batches of at most `max_batch_size` images."""
+        tensors = []
+        for img in data:
+            if not isinstance(img, Image.Image):
+                raise ValueError(f"data must be a list of PIL.Image.Image, not {type(img)}")
+            tensors.append(self._tensor(img))
+        # Without a size, images of different sizes cannot be stacked together
+        groups = {}
+        for idx, tensor in enumerate(tensors):
+            groups.setdefault(tuple(tensor.shape), []).append(idx)
+        feats = [None] * len(tensors)
+        with torch.no_grad():
+            for indices in groups.values():
+                for start in range(0, len(indices), self.max_batch_size):
+                    chunk = indices[start : start + self.max_batch_size]
+                    chunk_feats = self.mobilenet(torch.stack([tensors[idx] for idx in chunk])).numpy()
+                    for idx, idx_feats in zip(chunk, chunk_feats):
+                        feats[idx] = idx_feats
+        if len(feats) == 0:
+            return []
+        return super().extract_batch(data=np.stack(feats))
+
+    """Micro-batching"""
+
+    def enable_microbatching(self, max_batch_size=32, max_latency=0.01):
+        """Route `extract_feature` calls through a `MicroBatcher`. Images extracted concurrently, from several threads
+        or from `Schema.acheck`, are then scored together in one batched forward pass, which has a much higher
+        throughput than scoring them one by one.
+
+        Parameters
+        ----------
+        max_batch_size : int, optional
+            The maximum number of images in a forward pass, by default 32
+        max_latency : float, optional
+            The maximum time in seconds an image waits for its batch to fill up, by default 0.01
+        """
+        self.disable_microbatching()
+        self._batcher = MicroBatcher(self.extract_batch, max_batch_size=max_batch_size, max_latency=max_latency)
+        return self._batcher
+
+    def disable_microbatching(self):
+        if self._batcher is not None:
+            self._batcher.close()
+            self._batcher = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The batcher's worker thread cannot be pickled
+        state["_batcher"] = None
+        return state
+
     def build(self, data, batch_size=16):
         dataset = ImageDataset(loaded_data=data, transform=self.tfs)
         # data is a list of images here
@@ -80,5 +149,7 @@ class DN2OutlierScorer(KMeansOutlierScorer):
         b64 = jcr["clusters"]
         dist = jcr["dist"]
         size = jcr["size"]
-        clusters = np.frombuffer(base64.decodebytes(b64.encode()), dtype=np.float64).reshape((k, -1))
+        clusters = None
+        if b64 is not None:
+            clusters = np.frombuffer(base64.decodebytes(b64.encode()), dtype=np.float64).reshape((k, -1))
         return cls(k=k, size=size, clusters=clusters, dist=dist)
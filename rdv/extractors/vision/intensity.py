@@ -2,9 +2,13 @@ from PIL import Image, ImageFilter
 import numpy as np
 
 from rdv.extractors import FeatureExtractor
+from rdv.extractors.shared import shared
+from rdv.extractors.vision.preprocessing import grayscale_array
 
 
 class AvgIntensity(FeatureExtractor):
+    cost = 10
+    shareable = True
 
     _config_attrs = []
     _compile_attrs = []
@@ -15,9 +19,7 @@ class AvgIntensity(FeatureExtractor):
         pass
 
     def extract_feature(self, data):
-        img = data
-        img = img.convert("L")
-        return float(np.array(img).mean())
+        return float(shared(data, grayscale_array).mean())
 
     """Serializable inteface """
 
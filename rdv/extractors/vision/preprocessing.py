@@ -0,0 +1,35 @@
+"""Intermediate image representations shared between vision extractors. Request them with
+`rdv.extractors.shared.shared(img, func)`, so they are computed only once per image when a sample cache is active."""
+
+import numpy as np
+from torchvision import transforms
+
+from rdv.extractors.shared import shared
+
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+_to_normalized_tensor = transforms.Compose(
+    [
+        transforms.ToTensor(),
+        transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD),
+    ]
+)
+
+
+def grayscale(img):
+    return img.convert("L")
+
+
+def grayscale_array(img):
+    return np.array(shared(img, grayscale))
+
+
+def normalized_tensor(img):
+    """The image as a tensor, normalized with the ImageNet statistics."""
+    return _to_normalized_tensor(img)
+
+
+def resized_tensor(img, size):
+    """The normalized tensor of the image, resized to `size`."""
+    return transforms.Resize(size=size)(shared(img, normalized_tensor))
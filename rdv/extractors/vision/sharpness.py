@@ -2,6 +2,8 @@ from PIL import ImageFilter
 import numpy as np
 
 from rdv.extractors import FeatureExtractor
+from rdv.extractors.shared import shared
+from rdv.extractors.vision.preprocessing import grayscale
 
 
 class Sharpness(FeatureExtractor):
@@ -9,12 +11,14 @@ class Sharpness(FeatureExtractor):
     https://www.pyimagesearch.com/2015/09/07/blur-detection-with-opencv/
     """
 
+    cost = 10
+    shareable = True
+
     def __init__(self):
         pass
 
     def extract_feature(self, data):
-        img = data
-        img = img.convert("L")
+        img = shared(data, grayscale)
         filtered = img.filter(ImageFilter.Kernel((3, 3), (0, 1, 0, 1, -4, 1, 0, 1, 0), scale=1, offset=0))
         return float(np.array(filtered).mean())  # .var())
 
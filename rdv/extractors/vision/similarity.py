@@ -1,5 +1,6 @@
 import base64
 import json
+import logging
 import random
 from pathlib import Path
 
@@ -14,10 +15,15 @@ from rdv.dash.helpers import get_dash
 from rdv.extractors import FeatureExtractor
 from rdv.globals import Configurable
 
+logger = logging.getLogger(__name__)
+
 
 class FixedSubpatchSimilarity(FeatureExtractor, Configurable):
+    cost = 10
+    shareable = True
 
     _attrs = ["patch", "refs"]
+    _built_attrs = ["refs"]
     _patch_keys = ["x0", "y0", "x1", "y1"]
 
     def __init__(self, patch, refs=None, nrefs=10, idfr=None):
@@ -55,7 +61,7 @@ class FixedSubpatchSimilarity(FeatureExtractor, Configurable):
         else:
             raise ValueError(f"patch must be a dict or list, not {type(value)}")
         # make sure the correct keys are there
-        print(f"Patch set to: {self._patch} for {self}")
+        logger.debug("Patch set to: %s for %s", self._patch, self)
 
     @property
     def refs(self):
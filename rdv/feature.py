@@ -1,4 +1,9 @@
+import asyncio
+import copy
+import inspect
+import logging
 from collections.abc import Iterable
+from functools import partial
 from pydoc import locate
 from abc import ABC, abstractmethod
 
@@ -16,14 +21,28 @@ from rdv.globals import (
     SchemaStateException,
 )
 from rdv.stats import CategoricStats, NumericStats, equalize_domains
-from rdv.tags import Tag, SCHEMA_ERROR, SCHEMA_FEATURE
-from rdv.extractors import NoneExtractor
+from rdv.tags import Tag, SCHEMA_ERROR, SCHEMA_FEATURE, SCHEMA_FEATURE_LH, ERROR_VALUES, NO_ERROR
+from rdv.extractors import NoneExtractor, HEAVY_COST
+from rdv.extractors.shared import shared
+from rdv import instrumentation
+from rdv.instrumentation import EXTRACT, VALIDATE, TAG, BUILD_EXTRACTOR, BUILD_STATS
+
+logger = logging.getLogger(__name__)
 
 PLOTLY_COLORS = px.colors.qualitative.Plotly
 HIST_N_SAMPLES = 1000
 
 
+def accepts_group(method):
+    """Whether a method takes a `group` argument."""
+    parameters = inspect.signature(method).parameters
+    return "group" in parameters or any(p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters.values())
+
+
 class Feature(Serializable, Buildable, ABC):
+    # Whether feature2tag and check_invalid do not take the group, see __init_subclass__
+    _legacy_tags = False
+
     def __init__(self, name="default_name", extractor=None):
         self.name = str(name)
         if extractor is None:
@@ -37,21 +56,37 @@ class Feature(Serializable, Buildable, ABC):
 
     """Serializable interface """
 
-    def to_jcr(self):
+    def to_jcr(self, include_sketch=False):
         data = {
             "name": self.name,
             "extractor_class": self.extractor.class2str(),
             "extractor_state": self.extractor.to_jcr(),
-            "stats": self.stats.to_jcr(),
+            "stats": self.stats.to_jcr(include_sketch=include_sketch),
         }
         return data
 
     def build_extractor(self, loaded_data):
         self.extractor.build(loaded_data)
 
+    def extraction_key(self):
+        """Returns the key the extracted features are shared under, see `FeatureExtractor.share_key`."""
+        return ("extract", self.extractor.share_key())
+
+    def restore_extractor(self, extractor_state):
+        """Replaces the extractor by one of the same class with the given `to_jcr()` state, e.g. a built state."""
+        extractor = self.extractor.from_jcr(extractor_state)
+        if isinstance(extractor, Configurable):
+            extractor.idfr = self.name
+        self.extractor = extractor
+        logger.debug("Restored the extractor of %s", self.name)
+
     def build_stats(self, loaded_data):
-        print(f"Compiling stats for {self.name}")
         features = self.extract_features(loaded_data)
+        self.build_stats_from(features)
+
+    def build_stats_from(self, features):
+        """Builds the stats from already extracted features."""
+        logger.info("Compiling stats for %s", self.name)
         self.stats.build(features)
 
     def extract_features(self, loaded_data):
@@ -66,6 +101,13 @@ class Feature(Serializable, Buildable, ABC):
         return features
 
     def build(self, data):
+        instrument = instrumentation.active
+        if instrument is not None:
+            with instrument.timed(self.name, BUILD_EXTRACTOR):
+                self.build_extractor(data)
+            with instrument.timed(self.name, BUILD_STATS):
+                self.build_stats(data)
+            return
         # Compile extractor
         self.build_extractor(data)
         # Configure stats
@@ -74,29 +116,205 @@ class Feature(Serializable, Buildable, ABC):
     def is_built(self):
         return self.extractor.is_built() and self.stats.is_built()
 
+    def update(self, data, decay=None, window=None):
+        """Folds new data into the stats of the feature, without rebuilding the extractor, see
+        `rdv.stats.Stats.update`."""
+        self.update_from(self.extract_features(data), decay=decay, window=window)
+
+    def update_from(self, features, decay=None, window=None):
+        """Folds already extracted features into the stats."""
+        if not self.extractor.is_built():
+            raise SchemaStateException(f"Cannot update feature {self.name}, its extractor has not been built.")
+        self.stats.update(features, decay=decay, window=window)
+
+    def merge(self, other):
+        """Merges this feature with the same feature built on other data, see `rdv.stats.Stats.merge`. The merged
+        feature gets a copy of the extractor of this feature.
+
+        Both features must have the same extractor state, see `FeatureExtractor.fingerprint`. Extractors that learn
+        from the data, like the clusters of `KMeansOutlierScorer`, differ between partitions when built on each of them:
+        build the extractor once, restore it on every partition with `restore_extractor` and build the stats only, with
+        `build_stats`.
+
+        Returns
+        -------
+        Feature
+            A new, merged feature.
+        """
+        if type(other) is not type(self) or other.name != self.name:
+            raise DataException(f"Cannot merge {self} with {other}")
+        if other.extractor.fingerprint() != self.extractor.fingerprint():
+            raise DataException(
+                f"Cannot merge {self.name}, the features have differently configured or built extractors"
+            )
+        if not (self.is_built() and other.is_built()):
+            raise SchemaStateException(f"Cannot merge feature {self.name}, it has not been built.")
+        return type(self)(name=self.name, extractor=copy.deepcopy(self.extractor), stats=self.stats.merge(other.stats))
+
+    @property
+    def errname(self):
+        return f"{self.name}-err"
+
+    @property
+    def cost(self):
+        return self.extractor.cost
+
     def requires_config(self):
         return isinstance(self.extractor, Configurable) and not self.extractor.is_configured()
 
-    def check(self, data):
+    def check(self, data, group=None, likelihood=False):
+        instrument = instrumentation.active
+        if instrument is not None:
+            return self._check_instrumented(data, group, instrument, likelihood)
 
-        feature = self.extractor.extract_feature(data)
+        feature = self.extract(data)
         # Make a tag from the feature
-        feat_tag = self.feature2tag(feature)
-        # Check min, max, nan or None and raise data error
-        err_tag = self.check_invalid(feature)
-        tags = [feat_tag, err_tag]
+        if self._legacy_tags:
+            feat_tag, err_tag = self._legacy_check(feature, group)
+        else:
+            feat_tag = self.feature2tag(feature, group=group)
+            # Check min, max, nan or None and raise data error
+            err_tag = self.check_invalid(feature, group=group)
+        lh_tag = self.likelihood2tag(feat_tag, group=group) if likelihood else None
+        tags = [feat_tag, lh_tag, err_tag]
         # Filter Nones
         tags = [tag for tag in tags if tag is not None]
         return tags
 
+    def extract(self, data):
+        """Extracts the feature of a data instance, sharing it through the active sample cache with every feature that
+        has the same extractor, or an identically configured and built one if it is `shareable`."""
+        if self.cost > 0:
+            return shared(data, self.extractor.extract_feature, key=self.extraction_key())
+        # Not worth sharing
+        return self.extractor.extract_feature(data)
+
+    def _check_instrumented(self, data, group, instrument, likelihood=False):
+        with instrument.timed(self.name, EXTRACT):
+            feature = self.extract(data)
+        if self._legacy_tags:
+            with instrument.timed(self.name, TAG):
+                feat_tag, err_tag = self._legacy_check(feature, group)
+                lh_tag = self.likelihood2tag(feat_tag, group=group) if likelihood else None
+            return [tag for tag in (feat_tag, lh_tag, err_tag) if tag is not None]
+        with instrument.timed(self.name, TAG):
+            feat_tag = self.feature2tag(feature, group=group)
+            lh_tag = self.likelihood2tag(feat_tag, group=group) if likelihood else None
+        with instrument.timed(self.name, VALIDATE):
+            err_tag = self.check_invalid(feature, group=group)
+        return [tag for tag in (feat_tag, lh_tag, err_tag) if tag is not None]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Subclasses written before tags got their group when created override these without the group argument
+        cls._legacy_tags = not (accepts_group(cls.feature2tag) and accepts_group(cls.check_invalid))
+
+    def _legacy_check(self, feature, group):
+        tags = self.feature2tag(feature), self.check_invalid(feature)
+        for tag in tags:
+            if tag is not None:
+                tag.group = group
+        return tags
+
+    async def acheck(self, data, group=None, executor=None, heavy_cost=HEAVY_COST):
+        """Checks data without blocking the event loop. Features with a cheap extractor are checked inline, features
+        with an extractor cost of at least `heavy_cost` are checked in `executor`, or in the loop's default executor if
+        None.
+        """
+        if self.cost < heavy_cost:
+            return self.check(data, group=group)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, partial(self.check, data, group=group))
+
+    def check_columns(self, data):
+        features = self.extractor.extract_batch(data)
+        return self.validate_batch(features)
+
+    def check_batch(self, data, group=None, likelihood=False):
+        instrument = instrumentation.active
+        if instrument is None:
+            values, valid, errors = self.check_columns(data)
+            likelihoods = self.stats.likelihood(values) if likelihood else None
+            return self.batch2tags(values, valid, errors, group=group, likelihoods=likelihoods)
+        n = len(data)
+        with instrument.timed(self.name, EXTRACT, n=n):
+            features = self.extractor.extract_batch(data)
+        with instrument.timed(self.name, VALIDATE, n=n):
+            values, valid, errors = self.validate_batch(features)
+        with instrument.timed(self.name, TAG, n=n):
+            likelihoods = self.stats.likelihood(values) if likelihood else None
+            return self.batch2tags(values, valid, errors, group=group, likelihoods=likelihoods)
+
+    def batch2tags(self, values, valid, errors, group=None, likelihoods=None):
+        tagname = self.errname
+        if likelihoods is None:
+            likelihoods = [None] * len(valid)
+        else:
+            likelihoods = likelihoods.tolist()
+        batch_tags = []
+        for value, has_value, error, lh in zip(values.tolist(), valid, errors, likelihoods):
+            tags = []
+            if has_value:
+                tags.append(Tag(name=self.name, value=value, type=SCHEMA_FEATURE, group=group))
+                if lh is not None:
+                    tags.append(Tag(name=self.name, value=lh, type=SCHEMA_FEATURE_LH, group=group))
+            if error != NO_ERROR:
+                tags.append(Tag(name=tagname, value=ERROR_VALUES[error], type=SCHEMA_ERROR, group=group))
+            batch_tags.append(tags)
+        return batch_tags
+
+    def likelihood2tag(self, feat_tag, group=None):
+        """Returns the likelihood tag of a feature tag, or None if there is no feature tag. See
+        `rdv.stats.NumericStats.likelihood` and `rdv.stats.CategoricStats.likelihood`."""
+        if feat_tag is None:
+            return None
+        lh = float(self.stats.likelihood([feat_tag.value])[0])
+        return Tag(name=self.name, value=lh, type=SCHEMA_FEATURE_LH, group=group)
+
     @abstractmethod
-    def feature2tag(self, feature):
+    def feature2tag(self, feature, *, group=None):
         pass
 
     @abstractmethod
-    def check_invalid(self, feature):
+    def check_invalid(self, feature, *, group=None):
         pass
 
+    def validate_batch(self, features):
+        """Validates a batch of features at once. By default, this calls `feature2tag` and `check_invalid` for every
+        feature, override this if the validation can be vectorized.
+
+        Parameters
+        ----------
+        features : array-like
+            The extracted features, one per data instance.
+
+        Returns
+        -------
+        values : np.ndarray
+            The feature values, as they should appear in the feature tags.
+        valid : np.ndarray
+            Boolean mask of the features that get a feature tag.
+        errors : np.ndarray
+            Error code per feature, indexing `rdv.tags.ERROR_VALUES`, or `rdv.tags.NO_ERROR` if the feature is valid.
+        """
+        values, valid, errors = [], [], []
+        for feature in features:
+            feat_tag = self.feature2tag(feature)
+            err_tag = self.check_invalid(feature)
+            values.append(np.nan if feat_tag is None else feat_tag.value)
+            valid.append(feat_tag is not None)
+            if err_tag is None:
+                errors.append(NO_ERROR)
+            elif err_tag.value in ERROR_VALUES:
+                errors.append(ERROR_VALUES.index(err_tag.value))
+            else:
+                raise DataException(
+                    f"Error {err_tag.value} of {self.name} has no error code, override validate_batch to check batches"
+                )
+        values_array = np.empty(len(values), dtype=object)
+        values_array[:] = values
+        return values_array, np.array(valid, dtype=bool), np.array(errors, dtype=np.int8)
+
     def __repr__(self):
         return str(self)
 
@@ -143,25 +361,37 @@ class FloatFeature(Feature):
         else:
             raise DataException(f"stats for a NumericComponant should be of type NumericStats, not {type(value)}")
 
-    def feature2tag(self, feature):
-        if not np.isnan(feature):
-            return Tag(name=self.name, value=float(feature), type=SCHEMA_FEATURE)
+    def feature2tag(self, feature, *, group=None):
+        if feature is not None and not np.isnan(feature):
+            return Tag(name=self.name, value=float(feature), type=SCHEMA_FEATURE, group=group)
         else:
             return None
 
-    def check_invalid(self, feature):
-        tagname = f"{self.name}-err"
+    def check_invalid(self, feature, *, group=None):
+        tagname = self.errname
         if feature is None:
-            return Tag(name=tagname, value="Value None", type=SCHEMA_ERROR)
+            return Tag(name=tagname, value="Value None", type=SCHEMA_ERROR, group=group)
         elif np.isnan(feature):
-            return Tag(name=tagname, value="Value NaN", type=SCHEMA_ERROR)
+            return Tag(name=tagname, value="Value NaN", type=SCHEMA_ERROR, group=group)
         elif feature > self.stats.max:
-            return Tag(name=tagname, value="Value > max", type=SCHEMA_ERROR)
+            return Tag(name=tagname, value="Value > max", type=SCHEMA_ERROR, group=group)
         elif feature < self.stats.min:
-            return Tag(name=tagname, value="Value < min", type=SCHEMA_ERROR)
+            return Tag(name=tagname, value="Value < min", type=SCHEMA_ERROR, group=group)
         else:
             return None
 
+    def validate_batch(self, features):
+        values, isnone = numeric_array(features)
+        isnan = np.isnan(values)
+        errors = np.full(len(values), NO_ERROR, dtype=np.int8)
+        # Assign in reverse order of precedence, so the first failing check of check_invalid wins
+        with np.errstate(invalid="ignore"):
+            errors[values < self.stats.min] = ERROR_VALUES.index("Value < min")
+            errors[values > self.stats.max] = ERROR_VALUES.index("Value > max")
+        errors[isnan] = ERROR_VALUES.index("Value NaN")
+        errors[isnone] = ERROR_VALUES.index("Value None")
+        return values, ~(isnone | isnan), errors
+
     @classmethod
     def from_jcr(cls, jcr):
         classpath = jcr["extractor_class"]
@@ -189,7 +419,7 @@ class FloatFeature(Feature):
 
         fig.update_layout(**self.layout_settings(size))
         range_min, range_max = self.stats.percentiles[0], self.stats.percentiles[-1]
-        print(f"POI: {poi}")
+        logger.debug("POI: %s", poi)
         if poi and (isinstance(poi, float) or isinstance(poi, int)):
             fig.add_shape(
                 type="line",
@@ -267,25 +497,37 @@ class IntFeature(Feature):
         else:
             raise DataException(f"stats for a NumericComponant should be of type NumericStats, not {type(value)}")
 
-    def feature2tag(self, feature):
-        if not np.isnan(feature):
-            return Tag(name=self.name, value=float(feature), type=SCHEMA_FEATURE)
+    def feature2tag(self, feature, *, group=None):
+        if feature is not None and not np.isnan(feature):
+            return Tag(name=self.name, value=float(feature), type=SCHEMA_FEATURE, group=group)
         else:
             return None
 
-    def check_invalid(self, feature):
-        tagname = f"{self.name}-err"
+    def check_invalid(self, feature, *, group=None):
+        tagname = self.errname
         if feature is None:
-            return Tag(name=tagname, value="Value None", type=SCHEMA_ERROR)
+            return Tag(name=tagname, value="Value None", type=SCHEMA_ERROR, group=group)
         elif np.isnan(feature):
-            return Tag(name=tagname, value="Value NaN", type=SCHEMA_ERROR)
+            return Tag(name=tagname, value="Value NaN", type=SCHEMA_ERROR, group=group)
         elif feature > self.stats.max:
-            return Tag(name=tagname, value="Value > max", type=SCHEMA_ERROR)
+            return Tag(name=tagname, value="Value > max", type=SCHEMA_ERROR, group=group)
         elif feature < self.stats.min:
-            return Tag(name=tagname, value="Value < min", type=SCHEMA_ERROR)
+            return Tag(name=tagname, value="Value < min", type=SCHEMA_ERROR, group=group)
         else:
             return None
 
+    def validate_batch(self, features):
+        values, isnone = numeric_array(features)
+        isnan = np.isnan(values)
+        errors = np.full(len(values), NO_ERROR, dtype=np.int8)
+        # Assign in reverse order of precedence, so the first failing check of check_invalid wins
+        with np.errstate(invalid="ignore"):
+            errors[values < self.stats.min] = ERROR_VALUES.index("Value < min")
+            errors[values > self.stats.max] = ERROR_VALUES.index("Value > max")
+        errors[isnan] = ERROR_VALUES.index("Value NaN")
+        errors[isnone] = ERROR_VALUES.index("Value None")
+        return values, ~(isnone | isnan), errors
+
     @classmethod
     def from_jcr(cls, jcr):
         classpath = jcr["extractor_class"]
@@ -313,7 +555,7 @@ class IntFeature(Feature):
 
         fig.update_layout(**self.layout_settings(size))
         range_min, range_max = self.stats.percentiles[0], self.stats.percentiles[-1]
-        print(f"POI: {poi}")
+        logger.debug("POI: %s", poi)
         if poi and (isinstance(poi, float) or isinstance(poi, int)):
             fig.add_shape(
                 type="line",
@@ -393,23 +635,33 @@ class CategoricFeature(Feature):
         else:
             raise DataException(f"stats for a NumericComponant should be of type CategoricStats, not {type(value)}")
 
-    def feature2tag(self, feature):
-        if isinstance(feature, str) or not np.isnan(feature):
-            return Tag(name=self.name, value=feature, type=SCHEMA_FEATURE)
+    def feature2tag(self, feature, *, group=None):
+        if isinstance(feature, str) or not pd.isnull(feature):
+            return Tag(name=self.name, value=feature, type=SCHEMA_FEATURE, group=group)
         else:
             return None
 
-    def check_invalid(self, feature):
-        tagname = f"{self.name}-err"
+    def check_invalid(self, feature, *, group=None):
+        tagname = self.errname
         if feature is None:
-            return Tag(name=tagname, value="Value None", type=SCHEMA_ERROR)
+            return Tag(name=tagname, value="Value None", type=SCHEMA_ERROR, group=group)
         elif pd.isnull(feature):
-            return Tag(name=tagname, value="Value NaN", type=SCHEMA_ERROR)
+            return Tag(name=tagname, value="Value NaN", type=SCHEMA_ERROR, group=group)
         elif feature not in self.stats.domain_counts:
-            return Tag(name=tagname, value="Domain Error", type=SCHEMA_ERROR)
+            return Tag(name=tagname, value="Domain Error", type=SCHEMA_ERROR, group=group)
         else:
             return None
 
+    def validate_batch(self, features):
+        features = np.asarray(features, dtype=object)
+        isnone = np.array([f is None for f in features], dtype=bool)
+        isnull = pd.isnull(features)
+        errors = np.full(len(features), NO_ERROR, dtype=np.int8)
+        errors[~pd.Series(features).isin(list(self.stats.domain_counts)).values] = ERROR_VALUES.index("Domain Error")
+        errors[isnull] = ERROR_VALUES.index("Value NaN")
+        errors[isnone] = ERROR_VALUES.index("Value None")
+        return features, ~isnull, errors
+
     @classmethod
     def from_jcr(cls, jcr):
         classpath = jcr["extractor_class"]
@@ -471,6 +723,18 @@ class CategoricFeature(Feature):
         return fig
 
 
+def numeric_array(features):
+    """Converts a batch of numeric features to a float array, and a mask indicating which features were None."""
+    features = np.asarray(features)
+    if features.dtype == object:
+        isnone = np.array([f is None for f in features], dtype=bool)
+        values = np.array([np.nan if f is None else f for f in features], dtype=float)
+    else:
+        isnone = np.zeros(len(features), dtype=bool)
+        values = features.astype(float)
+    return values, isnone
+
+
 def plot_histogram(samples, range=None, dtype="float"):
     # px = sample_cdf(percentiles=percentiles, n_samples=1000, dtype=dtype)
     hist, edges = np.histogram(samples, bins=100, range=range)
@@ -17,6 +17,8 @@ class DataException(Exception):
 
 
 class Serializable(ABC):
+    __slots__ = ()
+
     def class2str(self):
         module = str(self.__class__.__module__)
         classname = str(self.__class__.__name__)
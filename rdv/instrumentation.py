@@ -0,0 +1,161 @@
+"""Timing hooks for the feature checks and builds.
+
+Instrumentation is disabled by default. Activate an `Instrument` to have every feature report how long each stage of
+its check or build took:
+
+    timings = TimingAggregator()
+    with instrumented(timings):
+        schema.check(data)
+    print(timings.summary())
+
+When no instrument is active, the only cost is one attribute lookup per feature check.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+EXTRACT = "extract"
+VALIDATE = "validate"
+TAG = "tag"
+BUILD_EXTRACTOR = "build_extractor"
+BUILD_STATS = "build_stats"
+
+STAGES = (EXTRACT, VALIDATE, TAG, BUILD_EXTRACTOR, BUILD_STATS)
+
+# The active instrument, None when instrumentation is disabled
+active = None
+
+
+class Instrument:
+    """Receives the timing of every instrumented stage. Subclass it and implement `record`."""
+
+    def record(self, feature, stage, elapsed, n=1, error=False):
+        """Called after every instrumented stage, from the thread that ran it.
+
+        Parameters
+        ----------
+        feature : str
+            The name of the feature.
+        stage : str
+            One of `STAGES`.
+        elapsed : float
+            Duration of the stage, in seconds.
+        n : int, optional
+            The number of data instances the stage handled, more than 1 for batch checks.
+        error : bool, optional
+            Whether the stage raised an exception.
+        """
+        raise NotImplementedError
+
+    @contextmanager
+    def timed(self, feature, stage, n=1):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.record(feature, stage, time.perf_counter() - start, n=n, error=True)
+            raise
+        self.record(feature, stage, time.perf_counter() - start, n=n)
+
+
+class TimingAggregator(Instrument):
+    """Aggregates call counts, cumulative and percentile latencies, and error counts per feature and stage.
+
+    Parameters
+    ----------
+    max_samples : int, optional
+        The number of most recent durations kept per feature and stage to compute percentiles, by default 10000. Counts
+        and cumulative times are exact.
+    """
+
+    def __init__(self, max_samples=10000):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._calls = {}
+            self._items = {}
+            self._errors = {}
+            self._total = {}
+            self._durations = {}
+
+    def record(self, feature, stage, elapsed, n=1, error=False):
+        key = (feature, stage)
+        with self._lock:
+            if key not in self._calls:
+                self._calls[key] = 0
+                self._items[key] = 0
+                self._errors[key] = 0
+                self._total[key] = 0.0
+                self._durations[key] = deque(maxlen=self.max_samples)
+            self._calls[key] += 1
+            self._items[key] += n
+            self._errors[key] += error
+            self._total[key] += elapsed
+            self._durations[key].append(elapsed)
+
+    def summary(self, percentiles=(50, 90, 99)):
+        """Returns the aggregated timings.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per feature and stage, with the number of calls, data instances and errors, the cumulative time,
+            the mean time per call, and the requested percentiles of the time per call, in seconds.
+        """
+        rows = []
+        with self._lock:
+            for key in self._calls:
+                row = {
+                    "feature": key[0],
+                    "stage": key[1],
+                    "calls": self._calls[key],
+                    "items": self._items[key],
+                    "errors": self._errors[key],
+                    "total": self._total[key],
+                    "mean": self._total[key] / self._calls[key],
+                }
+                durations = np.percentile(list(self._durations[key]), percentiles)
+                for perc, duration in zip(percentiles, durations):
+                    row[f"p{perc}"] = duration
+                rows.append(row)
+        columns = ["feature", "stage", "calls", "items", "errors", "total", "mean"] + [f"p{p}" for p in percentiles]
+        return pd.DataFrame(rows, columns=columns)
+
+    def costs(self, stages=(EXTRACT, VALIDATE, TAG)):
+        """The measured mean time per data instance of every feature, summed over `stages`. Can be passed as the `order`
+        of `Schema.check` to check the cheapest features first."""
+        costs = {}
+        with self._lock:
+            for (feature, stage), total in self._total.items():
+                if stage in stages:
+                    costs[feature] = costs.get(feature, 0.0) + total / self._items[(feature, stage)]
+        return costs
+
+
+def set_instrument(instrument):
+    """Activates `instrument` for all threads, or disables instrumentation if None. Returns the previous instrument."""
+    global active
+    if instrument is not None and not isinstance(instrument, Instrument):
+        raise ValueError(f"instrument should be an Instrument, not {type(instrument)}")
+    previous = active
+    active = instrument
+    return previous
+
+
+@contextmanager
+def instrumented(instrument=None):
+    """Activates an instrument within the context, a new `TimingAggregator` if None, and yields it."""
+    instrument = instrument if instrument is not None else TimingAggregator()
+    previous = set_instrument(instrument)
+    try:
+        yield instrument
+    finally:
+        set_instrument(previous)
@@ -0,0 +1,280 @@
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextvars import copy_context
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from rdv.extractors import HEAVY_COST
+from rdv.extractors.shared import sample_cache
+from rdv.streaming import chunked, to_batch
+
+_thread_pool = None
+_thread_pool_lock = threading.Lock()
+
+
+def get_thread_pool():
+    """Returns the thread pool shared by all schemas to evaluate features in parallel. Its size can be set with the
+    `RDV_THREADS` environment variable, and defaults to the one of `concurrent.futures.ThreadPoolExecutor`.
+    """
+    global _thread_pool
+    with _thread_pool_lock:
+        if _thread_pool is None:
+            max_workers = int(os.environ["RDV_THREADS"]) if "RDV_THREADS" in os.environ else None
+            _thread_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rdv")
+    return _thread_pool
+
+
+def preload(data):
+    """PIL loads image data lazily, which is not thread safe. Make sure images are loaded before sharing them between
+    threads."""
+    if isinstance(data, Image.Image):
+        data.load()
+    elif isinstance(data, (list, tuple)):
+        for instance in data:
+            if isinstance(instance, Image.Image):
+                instance.load()
+
+
+def map_features(func, features, heavy_cost=HEAVY_COST, executor=None):
+    """Calls `func` on every feature, running the features with an extractor cost of at least `heavy_cost` in the
+    thread pool. Cheap features run in the calling thread in the meantime, since scheduling them would cost more than
+    running them.
+
+    Returns
+    -------
+    results : list
+        The results of `func`, in the order of `features`.
+    """
+    executor = executor if executor is not None else get_thread_pool()
+    # Run in a copy of the current context, so the features share the active sample cache
+    futures = {
+        idx: executor.submit(copy_context().run, func, feat)
+        for idx, feat in enumerate(features)
+        if feat.cost >= heavy_cost
+    }
+    results = [None if idx in futures else func(feat) for idx, feat in enumerate(features)]
+    for idx, future in futures.items():
+        results[idx] = future.result()
+    return results
+
+
+_worker_schema = None
+
+
+def _init_worker(schema_json):
+    global _worker_schema
+    from rdv.schema import Schema
+
+    _worker_schema = Schema.from_jcr(json.loads(schema_json))
+
+
+def _check_chunk(chunk, convert_json):
+    return _worker_schema.check_batch(to_batch(chunk), convert_json=convert_json)
+
+
+def check_many(schema, data, workers=None, chunk_size=64, convert_json=True, mp_context=None):
+    """Checks data in a pool of worker processes. The schema is shipped to every worker once, as its JSON compatible
+    representation, and loaded by the worker's initializer. The data is sent to the workers in chunks, and at most two
+    chunks per worker are in flight at any time, so the data can be a lazy iterable.
+
+    Yields
+    ------
+    tags : list
+        The tags of every data instance, in input order.
+    """
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    schema_json = json.dumps(schema.to_jcr())
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=mp_context, initializer=_init_worker, initargs=(schema_json,)
+    ) as executor:
+        max_in_flight = 2 * workers
+        in_flight = deque()
+        for chunk in chunked(data, chunk_size=chunk_size):
+            in_flight.append(executor.submit(_check_chunk, chunk, convert_json))
+            if len(in_flight) >= max_in_flight:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+class SharedData:
+    """Ships a numeric array, or a list of images or arrays, to worker processes through shared memory. Only the name
+    of the shared memory block and the layout of the data are pickled, the workers read the data in place.
+
+    Indexing a shared list of images returns a copy of the image, as a PIL image if it was one.
+    """
+
+    image_modes = ("L", "RGB", "RGBA", "I", "F")
+
+    def __init__(self, data):
+        if isinstance(data, np.ndarray):
+            self.is_array = True
+            arrays = [data]
+            modes = [None]
+        else:
+            self.is_array = False
+            arrays = [np.asarray(instance) for instance in data]
+            modes = [instance.mode if isinstance(instance, Image.Image) else None for instance in data]
+
+        specs = []
+        offset = 0
+        for array, mode in zip(arrays, modes):
+            specs.append((offset, array.shape, array.dtype.str, mode))
+            offset += array.nbytes
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        self._owner = True
+        self.name = self._shm.name
+        self.specs = specs
+        for array, (offset, shape, dtype, _) in zip(arrays, specs):
+            self._view(offset, shape, dtype)[...] = array
+
+    @classmethod
+    def supports(cls, data):
+        if isinstance(data, np.ndarray):
+            return data.dtype.kind in "biuf"
+        return (
+            isinstance(data, (list, tuple))
+            and len(data) > 0
+            and all(
+                (isinstance(instance, Image.Image) and instance.mode in cls.image_modes)
+                or (isinstance(instance, np.ndarray) and instance.dtype.kind in "biuf")
+                for instance in data
+            )
+        )
+
+    def _view(self, offset, shape, dtype):
+        return np.ndarray(shape=shape, dtype=dtype, buffer=self._shm.buf, offset=offset)
+
+    def open(self):
+        """Returns the data, as an array or as a sequence of images."""
+        if self.is_array:
+            view = self._view(*self.specs[0][:3])
+            view.flags.writeable = False
+            return view
+        return self
+
+    def __len__(self):
+        return len(self.specs)
+
+    def __getitem__(self, idx):
+        offset, shape, dtype, mode = self.specs[idx]
+        array = self._view(offset, shape, dtype).copy()
+        if mode is not None:
+            return Image.fromarray(array, mode=mode)
+        return array
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def __getstate__(self):
+        return {"is_array": self.is_array, "name": self.name, "specs": self.specs}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shm = shared_memory.SharedMemory(name=self.name)
+        # Only the creating process cleans up the block
+        self._owner = False
+
+    def close(self):
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+_worker_data = None
+_worker_features = None
+
+
+def _init_build_worker(data, features=None):
+    global _worker_data, _worker_features
+    _worker_data = data.open() if isinstance(data, SharedData) else data
+    _worker_features = features
+
+
+def _build_feature(feat):
+    feat.build(_worker_data)
+    return feat.extractor, feat.stats
+
+
+def _build_extractor(feat):
+    feat.build_extractor(_worker_data)
+    return feat.extractor
+
+
+def _extract_shard(start, stop):
+    values = [[] for _ in _worker_features]
+    for idx in range(start, stop):
+        instance = _worker_data[idx]
+        with sample_cache():
+            for feat, feat_values in zip(_worker_features, values):
+                feat_values.append(feat.extract(instance))
+    return values
+
+
+def build_parallel(features, data, workers=None, mp_context=None):
+    """Builds features in a pool of worker processes, with the same result as building them one after another, apart
+    from the parts of extractors that depend on random numbers.
+
+    The data is sent to every worker once. Arrays and lists of images go through shared memory, other data is pickled.
+    DataFrames and arrays are built feature by feature, with independent features building concurrently. For other
+    data, the extractors are built concurrently first. Then a second pool is started with the built features, so they
+    are sent to every worker once like the data, the features are extracted from shards of the data by all workers,
+    and the stats are built on the collected values.
+
+    The extractors and stats of the features are replaced by the built ones.
+    """
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    features = list(features)
+    columnar = isinstance(data, (pd.DataFrame, np.ndarray))
+    if not columnar and not isinstance(data, (list, tuple)):
+        data = list(data)
+    shared = SharedData(data) if SharedData.supports(data) else None
+    worker_data = shared if shared is not None else data
+    try:
+        if columnar:
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=mp_context, initializer=_init_build_worker, initargs=(worker_data,)
+            ) as executor:
+                for feat, (extractor, stats) in zip(features, executor.map(_build_feature, features)):
+                    feat.extractor = extractor
+                    feat.stats = stats
+            return
+
+        # Extractors without a cost are not worth shipping
+        heavy = [idx for idx, feat in enumerate(features) if feat.cost > 0]
+        if len(heavy) > 0:
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=mp_context, initializer=_init_build_worker, initargs=(worker_data,)
+            ) as executor:
+                futures = {idx: executor.submit(_build_extractor, features[idx]) for idx in heavy}
+                for idx, future in futures.items():
+                    features[idx].extractor = future.result()
+        for idx, feat in enumerate(features):
+            if idx not in heavy:
+                feat.build_extractor(data)
+
+        n_shards = min(len(data), 2 * workers)
+        bounds = np.linspace(0, len(data), n_shards + 1).astype(int)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp_context,
+            initializer=_init_build_worker,
+            initargs=(worker_data, features),
+        ) as executor:
+            shards = [executor.submit(_extract_shard, start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+            values = [[] for _ in features]
+            for shard in shards:
+                for feat_values, shard_values in zip(values, shard.result()):
+                    feat_values.extend(shard_values)
+        for feat, feat_values in zip(features, values):
+            feat.build_stats_from(feat_values)
+    finally:
+        if shared is not None:
+            shared.close()
@@ -0,0 +1,92 @@
+"""Samplers that draw feature values from built stats, for histograms and simulations.
+
+A sampler precomputes the inverse CDF of the stats once and owns a seeded `np.random.Generator`, so repeated draws only
+cost the random numbers and a table lookup, and are reproducible. Stats keep their sampler until they are built again,
+see `NumericStats.sampler` and `CategoricStats.sampler`.
+
+Samplers without an explicit seed get one spawned from a root `np.random.SeedSequence`, so the streams of all samplers
+are independent and draws of different features are not correlated, while a program creating its samplers in the same
+order draws the same values.
+"""
+
+import threading
+
+import numpy as np
+
+DEFAULT_SEED = 0
+
+_root_seed = np.random.SeedSequence(DEFAULT_SEED)
+_root_seed_lock = threading.Lock()
+
+
+def spawn_seed():
+    """Returns a new seed, independent of all seeds spawned before."""
+    with _root_seed_lock:
+        return _root_seed.spawn(1)[0]
+
+
+class NumericSampler:
+    """Draws values from the CDF given by 101 percentiles, linear between the percentiles.
+
+    Parameters
+    ----------
+    percentiles : array-like
+        The 0th to 100th percentile.
+    seed : int or np.random.SeedSequence, optional
+        The seed of the random generator, by default a new independent one, see `spawn_seed`
+    """
+
+    def __init__(self, percentiles, seed=None):
+        table = np.asarray(percentiles, dtype=float)
+        # The inverse CDF between percentile i and i + 1 is start[i] + slope[i] * fraction
+        self.start = table[:-1]
+        self.slope = np.diff(table)
+        self.rng = np.random.default_rng(spawn_seed() if seed is None else seed)
+
+    def sample(self, n=1000, dtype="float", rng=None):
+        rng = self.rng if rng is None else rng
+        u = rng.random(n) * len(self.slope)
+        idx = u.astype(np.intp)
+        values = self.start[idx] + self.slope[idx] * (u - idx)
+        return values.astype(int) if dtype == "int" else values
+
+    @classmethod
+    def sample_many(cls, samplers, n=1000, rng=None):
+        """Draws `n` values from every sampler at once, with one generator.
+
+        Returns
+        -------
+        np.ndarray
+            The values, one row per sampler.
+        """
+        rng = np.random.default_rng(spawn_seed()) if rng is None else rng
+        start = np.stack([sampler.start for sampler in samplers])
+        slope = np.stack([sampler.slope for sampler in samplers])
+        u = rng.random((len(samplers), n)) * slope.shape[1]
+        idx = u.astype(np.intp)
+        return np.take_along_axis(start, idx, axis=1) + np.take_along_axis(slope, idx, axis=1) * (u - idx)
+
+
+class CategoricSampler:
+    """Draws values from the frequencies of a domain.
+
+    Parameters
+    ----------
+    domain_counts : dict
+        The frequency of every domain value.
+    seed : int or np.random.SeedSequence, optional
+        The seed of the random generator, by default a new independent one, see `spawn_seed`
+    """
+
+    def __init__(self, domain_counts, seed=None):
+        # Always in the same order, so the draws do not depend on the order of the domain counts
+        domain = sorted(domain_counts)
+        self.domain = np.array(domain)
+        cumulative = np.cumsum([domain_counts[key] for key in domain], dtype=float)
+        self.cumulative = cumulative / cumulative[-1] if len(cumulative) > 0 else cumulative
+        self.rng = np.random.default_rng(spawn_seed() if seed is None else seed)
+
+    def sample(self, n=1000, rng=None):
+        rng = self.rng if rng is None else rng
+        idx = np.searchsorted(self.cumulative, rng.random(n), side="right")
+        return self.domain[np.minimum(idx, len(self.domain) - 1)]
@@ -0,0 +1,144 @@
+"""Sampling for schema builds on a budget, with confidence bounds on the stats built from the sample.
+
+Percentiles: by the Dvoretzky-Kiefer-Wolfowitz inequality, the empirical CDF of n sampled values is within
+eps = sqrt(ln(2 / alpha) / (2 n)) of the true CDF everywhere, with a confidence of 1 - alpha. The true p-th
+percentile then lies between the sample percentiles at p - eps and p + eps.
+
+Extremes: the probability mass below the sample minimum (or above the sample maximum) is at most 1 - alpha^(1 / n).
+
+Domain frequencies: every frequency is within sqrt(ln(2 K / alpha) / (2 n)) of the true one, for a domain of K values
+(Hoeffding with a union bound). The total probability of the values that were not sampled is at most the fraction of
+values sampled only once plus (2 sqrt(2) + sqrt(3)) sqrt(ln(3 / alpha) / n) (McAllester and Schapire).
+
+Extremes and domains of features that are cheap to extract are scanned on all data instead, they are exact.
+"""
+
+import math
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+PERCENTILES = np.arange(start=0, stop=101, step=1)
+
+
+def reservoir_sample(iterable, k, seed=0, visit=None):
+    """Draws a uniform sample of `k` items from an iterable of unknown length in one pass, with Li's algorithm L.
+
+    Parameters
+    ----------
+    iterable : Iterable
+        The items to sample from.
+    k : int
+        The sample size.
+    seed : int, optional
+        Seed of the sampling, by default 0
+    visit : callable, optional
+        Called on every item of the iterable, sampled or not.
+
+    Returns
+    -------
+    sample : list
+        The sampled items, in no particular order. All items if there are at most `k`.
+    n_seen : int
+        The number of items in the iterable.
+    """
+    rng = np.random.default_rng(seed)
+    iterator = iter(iterable)
+    sample = list(islice(iterator, k))
+    if visit is not None:
+        for item in sample:
+            visit(item)
+    n_seen = len(sample)
+    if n_seen < k:
+        return sample, n_seen
+
+    w = math.exp(math.log(rng.random()) / k)
+    next_idx = n_seen + math.floor(math.log(rng.random()) / math.log(1 - w))
+    for item in iterator:
+        if visit is not None:
+            visit(item)
+        if n_seen == next_idx:
+            sample[rng.integers(k)] = item
+            w *= math.exp(math.log(rng.random()) / k)
+            next_idx += 1 + math.floor(math.log(rng.random()) / math.log(1 - w))
+        n_seen += 1
+    return sample, n_seen
+
+
+class Scan:
+    """Exact extremes of numeric values, or exact domain of categoric values, scanned over all data."""
+
+    def __init__(self, numeric):
+        self.numeric = numeric
+        self.min = math.inf
+        self.max = -math.inf
+        self.domain = set()
+
+    def update(self, value):
+        if value is None or (value.__class__ is not str and pd.isnull(value)):
+            return
+        if self.numeric:
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+        else:
+            self.domain.add(value)
+
+    def update_batch(self, values):
+        values = pd.Series(values)
+        values = values[~pd.isna(values)]
+        if len(values) == 0:
+            return
+        if self.numeric:
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+        else:
+            self.domain.update(values.unique())
+
+
+def numeric_bounds(values, confidence=0.95, extremes=None):
+    """Confidence bounds of numeric stats built on sampled `values`, see the module. `extremes` are the exact min and
+    max of all data, if they were scanned."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    n = len(values)
+    alpha = 1 - confidence
+    if n == 0:
+        # Nothing to bound
+        return {"n": 0, "confidence": confidence, "rank_error": 1.0}
+    eps = math.sqrt(math.log(2 / alpha) / (2 * n))
+    mass = 0.0 if extremes is not None else 1 - alpha ** (1 / n)
+    lower = np.percentile(values, np.clip(PERCENTILES - 100 * eps, 0, 100))
+    upper = np.percentile(values, np.clip(PERCENTILES + 100 * eps, 0, 100))
+    if extremes is not None:
+        # Bounds beyond the sampled ranks are the exact extremes, not the sampled ones
+        lower[PERCENTILES - 100 * eps <= 0] = extremes[0]
+        upper[PERCENTILES + 100 * eps >= 100] = extremes[1]
+    return {
+        "n": n,
+        "confidence": confidence,
+        "rank_error": eps,
+        "percentiles_lower": lower.tolist(),
+        "percentiles_upper": upper.tolist(),
+        "mass_below_min": mass,
+        "mass_above_max": mass,
+    }
+
+
+def categoric_bounds(values, confidence=0.95, exact_domain=False):
+    """Confidence bounds of categoric stats built on sampled `values`, see the module."""
+    values = pd.Series(values)
+    counts = values[~pd.isna(values)].value_counts()
+    n = int(counts.sum())
+    alpha = 1 - confidence
+    if n == 0:
+        # Nothing to bound
+        return {"n": 0, "confidence": confidence, "frequency_error": 1.0, "unseen_mass": 0.0 if exact_domain else 1.0}
+    singletons = int((counts == 1).sum())
+    unseen = singletons / n + (2 * math.sqrt(2) + math.sqrt(3)) * math.sqrt(math.log(3 / alpha) / n)
+    return {
+        "n": n,
+        "confidence": confidence,
+        "frequency_error": math.sqrt(math.log(2 * len(counts) / alpha) / (2 * n)),
+        "unseen_mass": 0.0 if exact_domain else min(unseen, 1.0),
+    }
@@ -1,16 +1,43 @@
+import asyncio
 import json
+import time
+import warnings
+from collections.abc import Iterable
 from pydoc import locate
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
 import dash_core_components as dcc
 import dash_html_components as html
 from dash.dependencies import Input, Output
 
 import rdv
-from rdv.globals import Buildable, SchemaStateException, Serializable
+from rdv.globals import Buildable, DataException, SchemaStateException, Serializable
 from rdv.dash.helpers import get_dash
-from rdv.tags import SCHEMA_FEATURE
+from rdv.compiled import CompiledSchema
+from rdv.tags import (
+    SCHEMA_ERROR,
+    SCHEMA_FEATURE,
+    SCHEMA_FEATURE_LH,
+    SCHEMA_GLOBAL_LH,
+    SCHEMA_SKIPPED,
+    ColumnarTags,
+    Tag,
+)
 from rdv.feature import Feature
+from rdv.extractors import HEAVY_COST
+from rdv.extractors.shared import sample_cache
+from rdv import instrumentation
+from rdv.instrumentation import BUILD_EXTRACTOR, BUILD_STATS, EXTRACT
+from rdv.parallel import build_parallel, check_many, get_thread_pool, map_features, preload
+from rdv.streaming import StreamProgress, chunked, to_batch
+from rdv.sampling import Scan, categoric_bounds, numeric_bounds, reservoir_sample
+from rdv.stats import CategoricStats, NumericStats, combine_likelihoods, drift_batch
+from rdv.cache import fingerprint_data
+
+# Number of features tested for drift at once
+DRIFT_CHUNK_SIZE = 256
 
 
 class Schema(Serializable, Buildable):
@@ -67,7 +94,7 @@ class Schema(Serializable, Buildable):
     def group_idfr(self):
         return f"{self.name}@{self.version}"
 
-    def to_jcr(self):
+    def to_jcr(self, include_sketch=False):
         jcr = {
             "name": self.name,
             "version": self.version,
@@ -75,7 +102,7 @@ class Schema(Serializable, Buildable):
         }
         features = []
         for feat in self.features.values():
-            features.append({"feature_class": feat.class2str(), "feature": feat.to_jcr()})
+            features.append({"feature_class": feat.class2str(), "feature": feat.to_jcr(include_sketch=include_sketch)})
         jcr["features"] = features
         return jcr
 
@@ -95,9 +122,11 @@ class Schema(Serializable, Buildable):
 
         return cls(name=name, version=version, features=features)
 
-    def save(self, fpath):
+    def save(self, fpath, include_sketch=False):
+        """Saves the schema as JSON. With `include_sketch`, the mergeable sketches of the stats are saved too, so the
+        loaded schema can be merged with others, see `merge`."""
         with open(fpath, "w") as f:
-            json.dump(self.to_jcr(), f, indent=4)
+            json.dump(self.to_jcr(include_sketch=include_sketch), f, indent=4)
 
     @classmethod
     def load(cls, fpath):
@@ -107,13 +136,330 @@ class Schema(Serializable, Buildable):
 
     """Buildable Interface"""
 
-    def build(self, data):
+    @classmethod
+    def from_dataframe(cls, data, name="default", version="0.0.0"):
+        """Creates and builds a schema with one feature per column of a DataFrame, like building a schema of
+        `construct_features(data.dtypes)`. The stats of all numeric columns are computed together with 2-D NumPy calls,
+        and those of all categoric columns in a single pass, which is much faster for wide tables. The stats are
+        identical to those of `build`.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The data to build the schema on.
+        name : str, optional
+            Name of the schema, by default "default"
+        version : str, optional
+            Version of the schema, by default "0.0.0"
+
+        Returns
+        -------
+        Schema
+            The built schema.
+        """
+        # Not imported at the top, it would import the KMeans extractor with rdv
+        from rdv.extractors.structured import construct_features
+
+        if not isinstance(data, pd.DataFrame):
+            raise DataException(f"data should be a DataFrame, not {type(data)}")
+        features = construct_features(data.dtypes)
+        numeric = [feat for feat in features if isinstance(feat.stats, NumericStats)]
+        categoric = [feat for feat in features if isinstance(feat.stats, CategoricStats)]
+        if len(numeric) > 0:
+            values = data[[feat.extractor.element for feat in numeric]].to_numpy(dtype=float)
+            for feat, stats in zip(numeric, NumericStats.build_columns(values)):
+                feat.stats = stats
+        if len(categoric) > 0:
+            values = data[[feat.extractor.element for feat in categoric]].to_numpy(dtype=object)
+            for feat, stats in zip(categoric, CategoricStats.build_columns(values)):
+                feat.stats = stats
+        return cls(name=name, version=version, features=features)
+
+    def build(
+        self,
+        data,
+        parallel=False,
+        fused=True,
+        workers=None,
+        mp_context=None,
+        chunked=False,
+        sample_size=None,
+        confidence=0.95,
+        seed=0,
+        cache=None,
+    ):
+        """Builds all features of the schema.
+
+        Parameters
+        ----------
+        data : any
+            The data to build the schema on.
+        parallel : bool, optional
+            Whether to build the features with an expensive extractor in the shared thread pool, by default False. Only
+            enable this when the extractors are thread safe.
+        fused : bool, optional
+            Whether to extract the features of all features in a single pass over the data, by default True. Every
+            extractor is built first, then every data instance is visited once and all its features are extracted
+            together, sharing intermediate representations like a decoded or converted image. Only applies when `data`
+            is an iterable of data instances, DataFrames and arrays are built feature by feature.
+        workers : int, optional
+            When set, builds the schema in a pool of this many worker processes, see `rdv.parallel.build_parallel`.
+            Independent features build concurrently and the feature extraction is sharded over the workers. Arrays and
+            lists of images are passed to the workers through shared memory. The result is identical to a serial build,
+            apart from the parts of extractors that depend on random numbers.
+        mp_context : multiprocessing context, optional
+            The context used to start the workers, see `concurrent.futures.ProcessPoolExecutor`.
+        chunked : bool, optional
+            Whether `data` is an iterable of chunks, like DataFrames read with `pd.read_csv(..., chunksize=...)` or
+            lists of images, by default False. Only one chunk is in memory at a time: the extractors are built on the
+            first chunk, and the stats are accumulated in bounded-memory sketches, see `rdv.sketch` for their accuracy.
+        sample_size : int, optional
+            When set, builds the schema on a uniform random sample of this many data instances, drawn in a single pass.
+            Features without an extraction cost are still scanned on all data, so their min, max and domain are exact.
+            The stats of every feature get `bounds`, with confidence bounds on their percentiles, extremes and domain
+            frequencies, see `rdv.sampling`. Only for DataFrames and iterables of data instances.
+        confidence : float, optional
+            The confidence level of the bounds of a sampled build, by default 0.95
+        seed : int, optional
+            Seed of the sampling, by default 0
+        cache : FeatureCache, optional
+            An on-disk cache of extracted feature values, see `rdv.cache`. Features whose extractor and data are
+            cached are restored from the cache instead of being built and extracted, the others are extracted and
+            cached. Features without an extraction cost are not cached. Only for DataFrames, arrays and iterables that
+            can be iterated over more than once.
+
+        Only one of `cache`, `sample_size`, `chunked`, `workers` and `parallel` can be used at a time, they are
+        different ways to build the schema. Combining them raises a ValueError.
+        """
+        options = {
+            "cache": cache is not None,
+            "sample_size": sample_size is not None,
+            "chunked": chunked,
+            "workers": workers is not None,
+            "parallel": parallel,
+        }
+        requested = [name for name, value in options.items() if value]
+        if len(requested) > 1:
+            raise ValueError(f"Cannot combine the build options {', '.join(requested)}, use one of them")
+
+        if cache is not None:
+            self._build_cached(data, cache)
+            return
+
+        if sample_size is not None:
+            self._build_sampled(data, sample_size=sample_size, confidence=confidence, seed=seed)
+            return
+
+        if chunked:
+            self._build_chunked(data)
+            return
+
+        if workers is not None:
+            build_parallel(self.features.values(), data, workers=workers, mp_context=mp_context)
+            return
+
+        if parallel:
+            preload(data)
+            map_features(lambda feat: feat.build(data), list(self.features.values()))
+            return
+
+        if fused and not isinstance(data, (pd.DataFrame, np.ndarray)) and isinstance(data, Iterable):
+            self._build_fused(data)
+            return
 
         # Build the schema
         for feat in self.features.values():
             # Compile stats
             feat.build(data)
 
+    def _build_fused(self, data, features=None):
+        features = list(self.features.values()) if features is None else features
+        instrument = instrumentation.active
+        for feat in features:
+            if instrument is None:
+                feat.build_extractor(data)
+            else:
+                with instrument.timed(feat.name, BUILD_EXTRACTOR):
+                    feat.build_extractor(data)
+
+        values = [[] for _ in features]
+        for instance in data:
+            # One cache per instance, so intermediates are shared between the features without piling up
+            with sample_cache():
+                for feat, feat_values in zip(features, values):
+                    if instrument is None:
+                        feat_values.append(feat.extract(instance))
+                    else:
+                        with instrument.timed(feat.name, EXTRACT):
+                            feat_values.append(feat.extract(instance))
+
+        for feat, feat_values in zip(features, values):
+            if instrument is None:
+                feat.build_stats_from(feat_values)
+            else:
+                with instrument.timed(feat.name, BUILD_STATS):
+                    feat.build_stats_from(feat_values)
+        return values
+
+    def _build_cached(self, data, cache):
+        if iter(data) is data:
+            raise ValueError("Cached builds need data that can be iterated over more than once, not an iterator")
+        data_fingerprint = fingerprint_data(data)
+        misses = []
+        for feat in self.features.values():
+            if feat.cost == 0:
+                misses.append((feat, None))
+                continue
+            key = cache.key(data_fingerprint, feat.extractor)
+            entry = cache.get(key)
+            if entry is None:
+                misses.append((feat, key))
+                continue
+            extractor_state, values = entry
+            feat.restore_extractor(extractor_state)
+            feat.build_stats_from(values)
+
+        features = [feat for feat, _ in misses]
+        if isinstance(data, (pd.DataFrame, np.ndarray)):
+            values = []
+            for feat in features:
+                feat.build_extractor(data)
+                values.append(feat.extract_features(data))
+                feat.build_stats_from(values[-1])
+        else:
+            values = self._build_fused(data, features=features)
+        for (feat, key), feat_values in zip(misses, values):
+            if key is not None:
+                cache.put(key, feat.extractor.to_jcr(), feat_values)
+
+    def _build_sampled(self, data, sample_size, confidence, seed):
+        if isinstance(data, np.ndarray):
+            raise ValueError("Sampled builds are not supported on arrays, use a DataFrame")
+        if isinstance(data, pd.DataFrame) and len(data) <= sample_size:
+            self.build(data)
+            return
+
+        features = list(self.features.values())
+        # Scan the extremes and domains of features that cost nothing to extract
+        scans = [Scan(numeric=isinstance(feat.stats, NumericStats)) if feat.cost == 0 else None for feat in features]
+        if isinstance(data, pd.DataFrame):
+            for feat, scan in zip(features, scans):
+                if scan is not None:
+                    scan.update_batch(feat.extract_features(data))
+            idx = np.sort(np.random.default_rng(seed).choice(len(data), size=sample_size, replace=False))
+            sample = data.iloc[idx]
+            for feat in features:
+                feat.build_extractor(sample)
+            values = [feat.extract_features(sample) for feat in features]
+        else:
+
+            def visit(instance):
+                for feat, scan in zip(features, scans):
+                    if scan is not None:
+                        scan.update(feat.extract(instance))
+
+            sample, n_seen = reservoir_sample(data, sample_size, seed=seed, visit=visit)
+            if n_seen <= sample_size:
+                self.build(sample)
+                return
+            for feat in features:
+                feat.build_extractor(sample)
+            values = [[] for _ in features]
+            for instance in sample:
+                with sample_cache():
+                    for feat, feat_values in zip(features, values):
+                        feat_values.append(feat.extract(instance))
+
+        for feat, feat_values, scan in zip(features, values, scans):
+            feat.build_stats_from(feat_values)
+            stats = feat.stats
+            if isinstance(stats, NumericStats):
+                if scan is not None and scan.min <= scan.max:
+                    stats.min, stats.max = scan.min, scan.max
+                    stats.percentiles = [scan.min] + list(stats.percentiles[1:-1]) + [scan.max]
+                    stats.sketch.moments.min, stats.sketch.moments.max = scan.min, scan.max
+                stats.bounds = numeric_bounds(
+                    feat_values, confidence=confidence, extremes=None if scan is None else (scan.min, scan.max)
+                )
+            elif isinstance(stats, CategoricStats):
+                if scan is not None:
+                    # Values that were not sampled are rare, but valid
+                    unseen = [key for key in scan.domain if key not in stats.domain_counts]
+                    stats.domain_counts = {**stats.domain_counts, **{key: 0.0 for key in unseen}}
+                    stats.sketch.add_counts({key: 0 for key in unseen})
+                stats.bounds = categoric_bounds(feat_values, confidence=confidence, exact_domain=scan is not None)
+
+    def _build_chunked(self, chunks):
+        features = list(self.features.values())
+        sketches = None
+        for chunk in chunks:
+            if sketches is None:
+                for feat in features:
+                    feat.build_extractor(chunk)
+                sketches = [feat.stats.new_sketch() for feat in features]
+
+            if isinstance(chunk, (pd.DataFrame, np.ndarray)):
+                for feat, sketch in zip(features, sketches):
+                    sketch.update(feat.extract_features(chunk))
+                continue
+            values = [[] for _ in features]
+            for instance in chunk:
+                with sample_cache():
+                    for feat, feat_values in zip(features, values):
+                        feat_values.append(feat.extract(instance))
+            for sketch, feat_values in zip(sketches, values):
+                sketch.update(feat_values)
+
+        if sketches is None:
+            raise DataException("Cannot build a schema on an empty iterable of chunks")
+        for feat, sketch in zip(features, sketches):
+            feat.stats.build_from_sketch(sketch)
+
+    def update(self, data, decay=None, window=None):
+        """Folds a batch of new data into the stats of all features, in time proportional to the size of the batch. The
+        extractors are not rebuilt. Use this to keep the reference stats of a long running validator up to date.
+
+        Parameters
+        ----------
+        data : any
+            The batch of data, like the data passed to `build`.
+        decay : float, optional
+            Fraction of the weight of the data seen so far that is forgotten at this update, between 0 and 1, for
+            exponentially decaying stats. Min and max keep the extremes of all data.
+        window : int, optional
+            Keep the stats of the last `window` batches only, counting the build as the first one. Use the same window
+            for every update.
+        """
+        features = list(self.features.values())
+        if isinstance(data, (pd.DataFrame, np.ndarray)) or not isinstance(data, Iterable):
+            for feat in features:
+                feat.update(data, decay=decay, window=window)
+            return
+
+        values = [[] for _ in features]
+        for instance in data:
+            with sample_cache():
+                for feat, feat_values in zip(features, values):
+                    feat_values.append(feat.extract(instance))
+        for feat, feat_values in zip(features, values):
+            feat.update_from(feat_values, decay=decay, window=window)
+
+    def merge(self, other):
+        """Merges this schema with the same schema built on other data, for example on another partition of the data or
+        on another machine, as if it was built on all data at once. The cost does not depend on the amount of data.
+        Use `functools.reduce` to merge many schemas. See `rdv.stats.Stats.merge` and `rdv.sketch` for the accuracy.
+        The extractors of both schemas must be in the same state, see `Feature.merge`.
+
+        Returns
+        -------
+        Schema
+            A new, merged schema with the name and version of this schema.
+        """
+        if list(other.features) != list(self.features):
+            raise DataException("Cannot merge schemas with different features")
+        features = [feat.merge(other.features[name]) for name, feat in self.features.items()]
+        return Schema(name=self.name, version=self.version, features=features)
+
     def is_built(self):
         return all(feat.is_built() for feat in self.features.values())
 
@@ -123,22 +469,364 @@ class Schema(Serializable, Buildable):
         return f'Schema(name="{self.name}", version="{self.version}"'
 
     def set_schema_group(self, tags):
+        """Deprecated, tags get the group of the schema when they are created."""
+        warnings.warn(
+            "Schema.set_schema_group is deprecated, tags get the schema group when they are created",
+            DeprecationWarning,
+            stacklevel=2,
+        )
         for feature_tag in tags:
             feature_tag.group = self.group_idfr
 
-    def check(self, data, convert_json=True):
+    def check(
+        self,
+        data,
+        convert_json=True,
+        columnar=False,
+        parallel=False,
+        features=None,
+        order=None,
+        fail_fast=False,
+        likelihood=False,
+    ):
+        """Checks a data instance against the schema.
+
+        Parameters
+        ----------
+        data : any
+            The data instance to check.
+        convert_json : bool, optional
+            Whether to convert the tags to their JSON compatible representation, by default True
+        columnar : bool, optional
+            Whether to return the tags as a `ColumnarTags` object instead, by default False. Ignores `convert_json`.
+        parallel : bool, optional
+            Whether to check the features with an expensive extractor in the shared thread pool, by default False. Cheap
+            features are checked in the calling thread. The order of the tags does not depend on this setting.
+        features : list[str], optional
+            The names of the features to check, by default all features.
+        order : str or list[str], optional
+            The order to check the features in. "cost" checks the features with the cheapest extractor first, a list of
+            feature names checks these first, in the given order, and a dict of measured costs per feature name, like
+            `rdv.instrumentation.TimingAggregator.costs()`, checks the cheapest features first. By default the features
+            are checked in schema order. The tags follow the order the features were checked in.
+        fail_fast : bool, optional
+            Whether to stop checking at the first feature that yields a schema error tag, by default False. The features
+            that were not checked get a tag of type `SCHEMA_SKIPPED`. Combine with `order="cost"` to only run
+            expensive features on data that passes the cheap checks.
+        likelihood : bool, optional
+            Whether to score how usual the data is, by default False. Every feature tag is followed by a tag of type
+            `SCHEMA_FEATURE_LH` with the likelihood of the feature value, between 0 and 1, see
+            `rdv.stats.NumericStats.likelihood` and `rdv.stats.CategoricStats.likelihood`. A last tag of type
+            `SCHEMA_GLOBAL_LH`, named after the schema, combines them, see `rdv.stats.combine_likelihoods`.
+
+        Returns
+        -------
+        tags : list or ColumnarTags
+        """
+        if not self.is_built():
+            raise SchemaStateException(f"Cannot check data on an unbuilt schema. Check whether all features are built.")
+        if fail_fast and parallel:
+            raise ValueError("fail_fast cannot be combined with parallel checking")
+        selected = self._select_features(features=features, order=order)
+        if columnar:
+            if fail_fast:
+                raise ValueError("fail_fast cannot be combined with columnar checking")
+            if likelihood:
+                raise ValueError("likelihood cannot be combined with columnar checking")
+            if features is None and order is None:
+                return self.check_batch([data], columnar=True)
+            return Schema(name=self.name, version=self.version, features=selected).check_batch([data], columnar=True)
+
         tags = []
-        if self.is_built():
-            for feature in self.features.values():
-                feature_tags = feature.check(data)
-                self.set_schema_group(feature_tags)
-                tags.extend(feature_tags)
+        group = self.group_idfr
+        # Features share intermediate representations of the data while checking it
+        with sample_cache():
+            if parallel:
+                preload(data)
+                features_tags = map_features(
+                    lambda feat: feat.check(data, group=group, likelihood=likelihood), selected
+                )
+                for feature_tags in features_tags:
+                    tags.extend(feature_tags)
+            else:
+                for idx, feature in enumerate(selected):
+                    feature_tags = feature.check(data, group=group, likelihood=likelihood)
+                    tags.extend(feature_tags)
+                    if fail_fast and any(tag.type == SCHEMA_ERROR for tag in feature_tags):
+                        tags.extend(
+                            Tag(
+                                name=skipped.name,
+                                value=f"Skipped after {feature.errname}",
+                                type=SCHEMA_SKIPPED,
+                                group=group,
+                            )
+                            for skipped in selected[idx + 1 :]
+                        )
+                        break
+        if likelihood:
+            tags.extend(self._global_likelihood_tags([tags], group=group)[0])
+        if convert_json:
+            tags = [t.to_jcr() for t in tags]
+        return tags
+
+    def _global_likelihood_tags(self, batch_tags, group):
+        """Returns the global likelihood tag of every data instance, combining the likelihoods of its features."""
+        likelihoods = np.full((len(batch_tags), len(self.features)), np.nan)
+        for idx, tags in enumerate(batch_tags):
+            lhs = [tag.value for tag in tags if tag.type == SCHEMA_FEATURE_LH]
+            likelihoods[idx, : len(lhs)] = lhs
+        combined = combine_likelihoods(likelihoods)
+        return [
+            [] if np.isnan(lh) else [Tag(name=self.name, value=float(lh), type=SCHEMA_GLOBAL_LH, group=group)]
+            for lh in combined
+        ]
+
+    def _select_features(self, features=None, order=None):
+        """Returns the features to check, in the order to check them in."""
+        if features is None:
+            selected = list(self.features.values())
         else:
+            unknown = [name for name in features if name not in self.features]
+            if len(unknown) > 0:
+                raise ValueError(f"Unknown features: {unknown}")
+            selected = [self.features[name] for name in features]
+
+        if order is None:
+            return selected
+        if order == "cost":
+            # Stable, keeps schema order between features of the same cost
+            return sorted(selected, key=lambda feat: feat.cost)
+        if isinstance(order, dict):
+            # Measured costs, features without a measurement go last
+            return sorted(selected, key=lambda feat: order.get(feat.name, np.inf))
+        if isinstance(order, (list, tuple)):
+            unknown = [name for name in order if name not in self.features]
+            if len(unknown) > 0:
+                raise ValueError(f"Unknown features in order: {unknown}")
+            rank = {name: idx for idx, name in enumerate(order)}
+            return sorted(selected, key=lambda feat: rank.get(feat.name, len(rank)))
+        raise ValueError(f'order should be "cost", a list of feature names or a dict of costs, not {order}')
+
+    async def acheck(self, data, convert_json=True, executor=None, heavy_cost=HEAVY_COST):
+        """Asynchronous version of `check`. Features are checked concurrently, features with a cheap extractor are
+        checked inline while the ones with an extractor cost of at least `heavy_cost` are offloaded to an executor, so
+        they don't block the event loop.
+
+        Parameters
+        ----------
+        data : any
+            The data instance to check.
+        convert_json : bool, optional
+            Whether to convert the tags to their JSON compatible representation, by default True
+        executor : concurrent.futures.Executor, optional
+            The thread or process pool to offload the heavy features to, by default the loop's default executor.
+            When using a process pool, the features and data are pickled for every check.
+        heavy_cost : int, optional
+            Extractor cost from which features are offloaded, by default `rdv.extractors.HEAVY_COST`
+
+        Returns
+        -------
+        tags : list
+        """
+        if not self.is_built():
             raise SchemaStateException(f"Cannot check data on an unbuilt schema. Check whether all features are built.")
+        group = self.group_idfr
+        features_tags = await asyncio.gather(
+            *[
+                feature.acheck(data, group=group, executor=executor, heavy_cost=heavy_cost)
+                for feature in self.features.values()
+            ]
+        )
+        tags = [tag for feature_tags in features_tags for tag in feature_tags]
         if convert_json:
             tags = [t.to_jcr() for t in tags]
         return tags
 
+    def check_batch(self, data, convert_json=True, columnar=False, likelihood=False):
+        """Checks a batch of data instances at once. Features are extracted and checked column-wise, which is a lot
+        faster than calling `check` for every instance if the extractors support vectorization.
+
+        Parameters
+        ----------
+        data : pd.DataFrame, np.ndarray or Iterable
+            The data instances to check. DataFrames and arrays are interpreted as one instance per row.
+        convert_json : bool, optional
+            Whether to convert the tags to their JSON compatible representation, by default True
+        columnar : bool, optional
+            Whether to return the tags as a `ColumnarTags` object instead, by default False. Ignores `convert_json`.
+        likelihood : bool, optional
+            Whether to add likelihood tags, see `check`, by default False. The likelihoods are computed for the whole
+            batch at once.
+
+        Returns
+        -------
+        tags : list or ColumnarTags
+            For every data instance, the list of tags that `check` would return for it.
+        """
+        if not self.is_built():
+            raise SchemaStateException(f"Cannot check data on an unbuilt schema. Check whether all features are built.")
+        if columnar and likelihood:
+            raise ValueError("likelihood cannot be combined with columnar checking")
+        if columnar:
+            with sample_cache():
+                columns = [feature.check_columns(data) for feature in self.features.values()]
+            return ColumnarTags.from_columns(names=list(self.features), group=self.group_idfr, columns=columns)
+        group = self.group_idfr
+        # Shares the rows of a DataFrame between the extractors that extract row by row
+        with sample_cache():
+            features_tags = [
+                feature.check_batch(data, group=group, likelihood=likelihood) for feature in self.features.values()
+            ]
+        batch_tags = [
+            [tag for feature_tags in instance_tags for tag in feature_tags] for instance_tags in zip(*features_tags)
+        ]
+        if likelihood:
+            for tags, global_tags in zip(batch_tags, self._global_likelihood_tags(batch_tags, group=group)):
+                tags.extend(global_tags)
+        if convert_json:
+            batch_tags = [[t.to_jcr() for t in tags] for tags in batch_tags]
+        return batch_tags
+
+    def check_stream(self, data, chunk_size=1000, convert_json=True, columnar=False, progress=None, likelihood=False):
+        """Checks a stream of data instances lazily, chunk by chunk, so only one chunk is kept in memory at a time.
+
+        Parameters
+        ----------
+        data : pd.DataFrame or Iterable
+            Any iterable or generator of data instances, like the rows of a CSV reader or images from a directory, or a
+            DataFrame, which is checked in slices of rows.
+        chunk_size : int, optional
+            The number of data instances checked together with `check_batch`, by default 1000
+        convert_json : bool, optional
+            Whether to convert the tags to their JSON compatible representation, by default True
+        columnar : bool, optional
+            Whether to yield one `ColumnarTags` object per chunk instead, by default False
+        progress : callable, optional
+            Called with a `rdv.streaming.StreamProgress` after every chunk, to report progress and throughput.
+        likelihood : bool, optional
+            Whether to add likelihood tags, see `check`, by default False
+
+        Yields
+        ------
+        tags : list or ColumnarTags
+            The tags of every data instance, in order, or the `ColumnarTags` of every chunk if `columnar` is set.
+        """
+        counters = StreamProgress()
+        for chunk in chunked(data, chunk_size=chunk_size):
+            start = time.perf_counter()
+            results = self.check_batch(
+                to_batch(chunk), convert_json=convert_json, columnar=columnar, likelihood=likelihood
+            )
+            counters.update(chunk_size=len(chunk), chunk_time=time.perf_counter() - start)
+            if progress is not None:
+                progress(counters)
+            if columnar:
+                yield results
+            else:
+                yield from results
+
+    def check_many(self, data, workers=None, chunk_size=64, convert_json=True, mp_context=None):
+        """Checks a large amount of data with a pool of worker processes, for CPU bound bulk validation.
+
+        Every worker loads the schema once, from its JSON compatible representation, so heavy state like neural networks
+        is not pickled for every task. The data is split in chunks that are checked with `check_batch` by the workers.
+
+        Parameters
+        ----------
+        data : pd.DataFrame or Iterable
+            The data instances to check. Can be a lazy iterable, only a couple of chunks per worker are kept in memory.
+            DataFrames are sent to the workers in slices of rows.
+        workers : int, optional
+            The number of worker processes, by default the number of CPUs.
+        chunk_size : int, optional
+            The number of data instances sent to a worker at once, by default 64
+        convert_json : bool, optional
+            Whether to convert the tags to their JSON compatible representation, by default True
+        mp_context : multiprocessing context, optional
+            The context used to start the workers, see `concurrent.futures.ProcessPoolExecutor`.
+
+        Returns
+        -------
+        tags : list
+            For every data instance, in input order, the list of tags that `check` would return for it.
+        """
+        if not self.is_built():
+            raise SchemaStateException(f"Cannot check data on an unbuilt schema. Check whether all features are built.")
+        return list(
+            check_many(
+                self,
+                data,
+                workers=workers,
+                chunk_size=chunk_size,
+                convert_json=convert_json,
+                mp_context=mp_context,
+            )
+        )
+
+    def drift_report(self, other, pthresh=0.05, parallel=False, chunk_size=DRIFT_CHUNK_SIZE):
+        """Tests every feature of the schema for drift against the same feature of one or many other schemas, without
+        starting a Dash app. The tests are computed from the stats alone, see `rdv.drift`, for many features at once.
+
+        Parameters
+        ----------
+        other : Schema or Iterable[Schema]
+            The schema, or the candidate schemas, to compare this reference schema to. They need at least the features
+            of this schema.
+        pthresh : float, optional
+            The p-value below which a feature has drifted, by default 0.05
+        parallel : bool, optional
+            Whether to test the chunks of features in the shared thread pool, by default False. Only worth it when
+            comparing many features or candidates.
+        chunk_size : int, optional
+            The number of features tested at once, by default 256. Bounds the memory of the vectorized tests.
+
+        Returns
+        -------
+        report : pd.DataFrame
+            One row per feature, with the columns `feature`, `statistic`, `pvalue` and `drift`. When comparing to
+            many schemas, the rows of all candidates are concatenated, with the position of the candidate in a leading
+            `candidate` column.
+        """
+        many = not isinstance(other, Schema)
+        others = list(other) if many else [other]
+        for schema in [self] + others:
+            if not schema.is_built():
+                raise SchemaStateException(f"Cannot compare unbuilt schema {schema.name}")
+        pairs = []
+        for schema in others:
+            missing = [name for name in self.features if name not in schema.features]
+            if len(missing) > 0:
+                raise SchemaStateException(f"Schema {schema.name} is missing the features {missing}")
+            pairs.extend((feat.stats, schema.features[name].stats) for name, feat in self.features.items())
+
+        chunks = [pairs[start : start + chunk_size] for start in range(0, len(pairs), chunk_size)]
+        if parallel and len(chunks) > 1:
+            results = list(get_thread_pool().map(lambda chunk: drift_batch(chunk, pthresh=pthresh), chunks))
+        else:
+            results = [drift_batch(chunk, pthresh=pthresh) for chunk in chunks]
+        statistic, pvalue, drift = (np.concatenate(result) for result in zip(*results)) if results else ([], [], [])
+
+        report = pd.DataFrame(
+            {
+                "feature": list(self.features) * len(others),
+                "statistic": np.asarray(statistic, dtype=float),
+                "pvalue": np.asarray(pvalue, dtype=float),
+                "drift": np.asarray(drift, dtype=bool),
+            }
+        )
+        if many:
+            report.insert(0, "candidate", np.repeat(np.arange(len(others)), len(self.features)))
+        return report
+
+    def compile(self):
+        """Freezes the built schema into a `CompiledSchema`, a flat validator with minimal per-check overhead.
+
+        Returns
+        -------
+        compiled : rdv.compiled.CompiledSchema
+        """
+        return CompiledSchema(self)
+
     def drop_feature(self, name):
         self.features = [c for c in self.features.values() if c.name != name]
 
@@ -238,10 +926,11 @@ class Schema(Serializable, Buildable):
         app.run_server(**kwargs)
 
     def compare(self, other, pthresh=0.05, mode="inline"):
+        report = self.drift_report(other, pthresh=pthresh).set_index("feature")
+        drift_results = dict(zip(report.index, zip(report["pvalue"], report["drift"])))
+
         def drift_cell(feat_name):
-            self_feat = self.features[feat_name]
-            other_feat = other.features[feat_name]
-            _, pvalue, drift = self_feat.stats.test_drift(other_feat.stats, pthresh=pthresh)
+            pvalue, drift = drift_results[feat_name]
             if drift:
                 return html.Span(className="Label mr-1 Label--red", children=f"{pvalue:.2E}")
             else:
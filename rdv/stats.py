@@ -1,6 +1,8 @@
+import copy
+
 import numpy as np
 import pandas as pd
-from scipy.stats import chisquare, ks_2samp
+from scipy.stats import chi2
 from abc import ABC, abstractmethod
 
 from rdv.globals import (
@@ -8,6 +10,34 @@ from rdv.globals import (
     Serializable,
     DataException,
 )
+from rdv.drift import chi2_drift, ks_drift
+from rdv.sampler import DEFAULT_SEED, CategoricSampler, NumericSampler
+from rdv.sketch import CategoricSketch, NumericSketch, SlidingWindow
+
+# Sample size of stats saved without one, for drift tests
+DEFAULT_SAMPLESIZE = 1000
+
+
+def sorted_percentiles(data, n_valid):
+    """The 0th to 100th percentile of every column of `data`, sorted along the columns with its `n_valid` valid values
+    first. Interpolates linearly with the same arithmetic as `np.percentile`, so the results are identical to calling it
+    on the valid values of every column, but for all columns at once."""
+    quantiles = np.true_divide(np.arange(start=0, stop=101, step=1), 100)[:, None]
+    virtual = (n_valid - 1) * quantiles
+    previous = np.floor(virtual).astype(np.intp)
+    above = virtual >= n_valid - 1
+    below = virtual < 0
+    previous[above] = -1
+    previous[below] = 0
+    gamma = virtual - previous
+    last = np.broadcast_to(n_valid - 1, previous.shape)
+    lo = np.where(above, last, previous)
+    hi = np.where(above, last, np.where(below, 0, np.minimum(previous + 1, last)))
+    cols = np.arange(data.shape[1])
+    a, b = data[lo, cols], data[hi, cols]
+    diff = b - a
+    result = a + diff * gamma
+    return np.where(gamma >= 0.5, b - diff * (1 - gamma), result)
 
 
 class Stats(Serializable, Buildable, ABC):
@@ -19,12 +49,85 @@ class Stats(Serializable, Buildable, ABC):
     def test_drift(self, other):
         raise NotImplementedError
 
+    def new_sketch(self):
+        """Returns an empty sketch to accumulate the stats of data in chunks. Override this, `build_from_sketch` and
+        `get_sketch` to make stats mergeable."""
+        raise DataException(f"{type(self).__name__} is not mergeable, it does not implement new_sketch")
+
+    def build_from_sketch(self, sketch):
+        raise DataException(f"{type(self).__name__} is not mergeable, it does not implement build_from_sketch")
+
+    def get_sketch(self):
+        """Returns the mergeable sketch these stats were built from."""
+        raise DataException(f"{type(self).__name__} is not mergeable, it does not implement get_sketch")
+
+    def merge(self, other):
+        """Merges these stats with stats of the same feature on other data, as if they were built on all data at once.
+        The cost of merging does not depend on the amount of data.
+
+        Returns
+        -------
+        Stats
+            New, merged stats. Neither of the merged stats is changed.
+        """
+        if type(other) is not type(self):
+            raise DataException(f"Cannot merge {type(self).__name__} with {type(other).__name__}")
+        if not (self.is_built() and other.is_built()):
+            raise DataException("Cannot merge stats that are not built")
+        sketch = copy.deepcopy(self.get_sketch())
+        sketch.merge(other.get_sketch())
+        merged = type(self)()
+        merged.build_from_sketch(sketch)
+        return merged
+
+    def update(self, data, decay=None, window=None):
+        """Folds new data into the stats, in time proportional to the size of `data`, not to all data seen so far. The
+        stats are up to date after every update. Unbuilt stats are built on the data.
+
+        Parameters
+        ----------
+        data : array-like
+            The new feature values.
+        decay : float, optional
+            Fraction of the weight of the data seen so far that is forgotten, between 0 and 1. With exponential decay
+            the stats track recent data, but min and max keep the extremes of all data.
+        window : int, optional
+            Keep the stats of the last `window` updates only, including the build as the first one. Cannot be
+            combined with `decay`.
+        """
+        batch = self.new_sketch()
+        batch.update(data)
+        self.update_sketch(batch, decay=decay, window=window)
+
+    def update_sketch(self, batch, decay=None, window=None):
+        """Folds the sketch of new data into the stats, see `update`."""
+        if decay is not None and window is not None:
+            raise ValueError("Use either decay or window, not both")
+        built = self.is_built()
+        if window is not None:
+            if self.window is None or self.window.size != window:
+                self.window = SlidingWindow(window, [self.get_sketch()] if built else [])
+            self.window.append(batch)
+            sketch = self.window.merged()
+        elif built:
+            sketch = self.get_sketch()
+            if decay is not None:
+                if not 0 <= decay < 1:
+                    raise ValueError(f"decay should be in [0, 1), not {decay}")
+                sketch.decay(1 - decay)
+            sketch.merge(batch)
+        else:
+            sketch = batch
+        self.build_from_sketch(sketch)
+
 
 class NumericStats(Stats):
 
     _attrs = ["min", "max", "mean", "std", "pinv", "percentiles"]
 
-    def __init__(self, min=None, max=None, mean=None, std=None, pinv=None, percentiles=None):
+    def __init__(
+        self, min=None, max=None, mean=None, std=None, pinv=None, percentiles=None, sketch=None, samplesize=None
+    ):
 
         self.min = min
         self.max = max
@@ -32,6 +135,11 @@ class NumericStats(Stats):
         self.std = std
         self.pinv = pinv
         self.percentiles = percentiles
+        self.samplesize = samplesize
+        self.sketch = sketch
+        self.window = None
+        # Confidence bounds of stats built on a sample, see rdv.sampling
+        self.bounds = None
 
     """MIN"""
 
@@ -107,6 +215,9 @@ class NumericStats(Stats):
             self._percentiles = list(value)
         else:
             raise DataException("stats.percentiles must be None or a list of length 101.")
+        # Derived from the percentiles
+        self._rank_table = None
+        self._sampler = None
 
     """Size of the sample that was analyzed"""
 
@@ -120,12 +231,35 @@ class NumericStats(Stats):
             raise DataException("stats.pinv cannot be NaN")
         self._samplesize = value
 
+    """Sketch"""
+
+    @property
+    def sketch(self):
+        if self._sketch is None and self._sketch_values is not None:
+            # Built on first use, most stats are never merged or updated
+            values, n_invalid = self._sketch_values
+            self._sketch = self.new_sketch()
+            self._sketch.update(values)
+            self._sketch.n_invalid = n_invalid
+            self._sketch_values = None
+        return self._sketch
+
+    @sketch.setter
+    def sketch(self, value):
+        self._sketch = value
+        # The valid values and number of invalid values to build the sketch from
+        self._sketch_values = None
+
     """Serializable Interface"""
 
-    def to_jcr(self):
+    def to_jcr(self, include_sketch=False):
         data = {}
         for attr in self._attrs:
             data[attr] = getattr(self, attr)
+        # Not required to be built, but drift tests need it
+        data["samplesize"] = self.samplesize
+        if include_sketch and self.sketch is not None:
+            data["sketch"] = self.sketch.to_jcr()
         return data
 
     @classmethod
@@ -133,14 +267,22 @@ class NumericStats(Stats):
         d = {}
         for attr in cls._attrs:
             d[attr] = jcr[attr]
+        d["samplesize"] = jcr.get("samplesize")
+        if jcr.get("sketch") is not None:
+            d["sketch"] = NumericSketch.from_jcr(jcr["sketch"])
         return cls(**d)
 
     """Buildable Interface"""
 
     def build(self, data):
+        self.window = None
+        self.bounds = None
         data = np.array(data)
         invalids = data[np.isnan(data)]
         data = data[~np.isnan(data)]
+        # Keep what is needed for a mergeable summary of the data, see sketch
+        self.sketch = None
+        self._sketch_values = (data, len(invalids))
 
         self.min = float(np.min(data))
         self.max = float(np.max(data))
@@ -155,47 +297,171 @@ class NumericStats(Stats):
         self.pinv = len(invalids) / len(data)
         self.samplesize = len(data)
 
+    @classmethod
+    def build_columns(cls, data):
+        """Builds the stats of every column of a 2-D array with whole-array NumPy calls, which is much faster than
+        building them column by column for wide data. The stats are identical to those of `build` on every column.
+
+        Parameters
+        ----------
+        data : np.ndarray
+            The values, with one column per feature.
+
+        Returns
+        -------
+        list[NumericStats]
+            The built stats of every column.
+        """
+        data = np.asarray(data, dtype=float)
+        n, m = data.shape
+        invalid = np.isnan(data)
+        n_invalid = invalid.sum(axis=0)
+        n_valid = n - n_invalid
+        if (n_valid == 0).any():
+            raise DataException("Cannot build numeric stats without valid values")
+        # The valid values of every column first, in their original order, so they are reduced in the same order
+        if n_invalid.any():
+            order = np.argsort(invalid, axis=0, kind="stable")
+            data = np.take_along_axis(data, order, axis=0)
+        data = np.asfortranarray(data)
+        percentiles = sorted_percentiles(np.sort(data, axis=0), n_valid)
+
+        all_stats = [None] * m
+        # Columns with as many valid values are reduced together
+        for size in np.unique(n_valid):
+            cols = np.flatnonzero(n_valid == size)
+            block = np.asfortranarray(data[:size, cols])
+            mins, maxs = block.min(axis=0), block.max(axis=0)
+            means, stds = block.mean(axis=0), block.std(axis=0)
+            for j, col in enumerate(cols):
+                stats = cls()
+                stats.min = float(mins[j])
+                stats.max = float(maxs[j])
+                stats.mean = float(means[j])
+                stats.std = float(stds[j])
+                stats.percentiles = percentiles[:, col]
+                stats.pinv = int(n_invalid[col]) / int(size)
+                stats.samplesize = int(size)
+                stats._sketch_values = (block[:, j], int(n_invalid[col]))
+                all_stats[col] = stats
+        return all_stats
+
+    def new_sketch(self):
+        """Returns an empty sketch to accumulate the stats of data in chunks, see `build_from_sketch`."""
+        return NumericSketch()
+
+    def build_from_sketch(self, sketch):
+        """Builds the stats from a `rdv.sketch.NumericSketch`. Counts, min, max, mean and std are exact, the
+        percentiles are exact for up to `sketch.quantiles.k` values and approximate above."""
+        if sketch.count == 0:
+            raise DataException("Cannot build numeric stats without valid values")
+        self.min = sketch.moments.min
+        self.max = sketch.moments.max
+        self.mean = sketch.moments.mean
+        self.std = sketch.moments.std
+        self.percentiles = sketch.percentiles()
+        self.pinv = sketch.n_invalid / sketch.count
+        self.samplesize = sketch.count
+        self.sketch = sketch
+        self.bounds = None
+
+    def get_sketch(self):
+        if self.sketch is None:
+            # Loaded without their sketch, approximate it from the percentiles
+            return NumericSketch.from_stats(
+                self.percentiles, self.mean, self.std, self.min, self.max, pinv=self.pinv, samplesize=self.n_valid
+            )
+        return self.sketch
+
     def is_built(self):
         return all(getattr(self, attr) is not None for attr in self._attrs)
 
+    """Likelihood"""
+
+    def rank(self, values):
+        """The percentile rank of every value, between 0 and 1: the fraction of the data below it, interpolated linearly
+        between the percentiles. Values that equal a run of tied percentiles get the middle of the run. NaN for NaN."""
+        if self._rank_table is None:
+            self._rank_table = np.array(self.percentiles, dtype=float)
+        table = self._rank_table
+        values = np.asarray(values, dtype=float)
+        # The percentiles equal to a value are table[lo:hi]
+        lo = np.searchsorted(table, values, side="left")
+        hi = np.searchsorted(table, values, side="right")
+        below = table[np.clip(lo - 1, 0, 100)]
+        above = table[np.clip(lo, 0, 100)]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            between = lo - 1 + (values - below) / (above - below)
+        ranks = np.where(hi > lo, (lo + hi - 1) / 2, between)
+        ranks = np.where(lo == 0, np.where(hi > 0, ranks, 0), ranks)
+        ranks = np.where(lo > 100, 100, ranks) / 100
+        return np.where(np.isnan(values), np.nan, ranks)
+
+    def likelihood(self, values):
+        """How usual every value is, between 0 and 1: the probability of a value at least as far from the median, on
+        either side. 1 at the median, 0 below the min or above the max. NaN for NaN."""
+        values = np.asarray(values, dtype=float)
+        ranks = self.rank(values)
+        lh = np.minimum(1.0, 2 * np.minimum(ranks, 1 - ranks))
+        # Percentiles do not resolve likelihoods below a percent, values between min and max are at least that likely
+        with np.errstate(invalid="ignore"):
+            seen = (values >= self.percentiles[0]) & (values <= self.percentiles[-1])
+        return np.where(seen, np.maximum(lh, 0.01), lh)
+
     """Testing and sampling functions"""
 
     def test_drift(self, other, pthresh=0.05):
-        sample_self = self.sample(n=1000)
-        sample_other = other.sample(n=1000)
-        stat, pvalue = ks_2samp(data1=sample_self, data2=sample_other, alternative="two-sided", mode="auto")
-        drift = pvalue < pthresh
-        return stat, pvalue, drift
-
-    def sample(self, n=1000, dtype="float"):
-        # Sample floats in range 0 - len(percentiles)
-        samples = np.random.random(n) * 100
-
-        # We will lineraly interpolate the sample between the percentiles, so get their integer floor and ceil percentile, and the relative diztance from the floor (between 0 and 1)
-        floor_percentiles = np.floor(samples).astype("uint8")
-        ceil_percentiles = np.ceil(samples).astype("uint8")
-        percentiles_alpha = samples - np.floor(samples)
-
-        percentiles = np.array(self.percentiles)
-        px = percentiles[floor_percentiles] * (1 - percentiles_alpha) + percentiles[ceil_percentiles] * (
-            percentiles_alpha
-        )
+        """Two-sample Kolmogorov-Smirnov test between these stats and `other`, computed from the percentiles, see
+        `rdv.drift`.
+
+        Returns
+        -------
+        stat : float
+            The KS distance.
+        pvalue : float
+            Its p-value.
+        drift : bool
+            Whether the p-value is below `pthresh`.
+        """
+        stat, pvalue, drift = drift_batch([(self, other)], pthresh=pthresh)
+        return float(stat[0]), float(pvalue[0]), bool(drift[0])
 
-        if dtype == "int":
-            return px.astype(np.int)
-        else:
-            return px
+    @property
+    def n_valid(self):
+        """The number of valid values the stats were built on. Stats loaded from before it was saved assume 1000."""
+        if self.samplesize is not None:
+            return self.samplesize
+        if self.sketch is not None:
+            return self.sketch.count
+        return DEFAULT_SAMPLESIZE
+
+    @property
+    def sampler(self):
+        """The `rdv.sampler.NumericSampler` of the stats, kept until they are built again."""
+        if self._sampler is None:
+            self._sampler = NumericSampler(self.percentiles)
+        return self._sampler
+
+    def sample(self, n=1000, dtype="float", seed=None):
+        """Draws `n` values, linearly interpolated between the percentiles. Successive draws continue the random
+        generator of the sampler, unless a `seed` is given."""
+        rng = None if seed is None else np.random.default_rng(seed)
+        return self.sampler.sample(n=n, dtype=dtype, rng=rng)
 
 
 class CategoricStats(Stats):
 
     _attrs = ["domain_counts", "pinv", "samplesize"]
 
-    def __init__(self, domain_counts=None, pinv=None, samplesize=None):
+    def __init__(self, domain_counts=None, pinv=None, samplesize=None, sketch=None):
 
         self.domain_counts = domain_counts
         self.pinv = pinv
         self.samplesize = samplesize
+        self.sketch = sketch
+        self.window = None
+        # Confidence bounds of stats built on a sample, see rdv.sampling
+        self.bounds = None
 
     """domain_counts"""
 
@@ -214,6 +480,9 @@ class CategoricStats(Stats):
             self._domain_counts = value
         else:
             raise DataException(f"stats.domain_counts should be a dict, not {type(value)}")
+        # Derived from the domain counts
+        self._rank_table = None
+        self._sampler = None
 
     """PINV"""
 
@@ -237,11 +506,13 @@ class CategoricStats(Stats):
             raise DataException("stats.pinv cannot be NaN")
         self._samplesize = value
 
-    def to_jcr(self):
+    def to_jcr(self, include_sketch=False):
         data = {}
         for attr in self._attrs:
             value = getattr(self, attr)
             data[attr] = value
+        if include_sketch and self.sketch is not None:
+            data["sketch"] = self.sketch.to_jcr()
         return data
 
     @classmethod
@@ -249,35 +520,147 @@ class CategoricStats(Stats):
         d = {}
         for attr in cls._attrs:
             d[attr] = jcr[attr]
+        if jcr.get("sketch") is not None:
+            d["sketch"] = CategoricSketch.from_jcr(jcr["sketch"])
         return cls(**d)
 
     def build(self, data):
+        self.window = None
+        self.bounds = None
         data = pd.Series(data)
-        self.domain_counts = data[~pd.isna(data)].value_counts(normalize=True).to_dict()
-        invalids = data[pd.isna(data)]
-        self.pinv = len(invalids) / len(data)
+        invalid = pd.isna(data)
+        counts = data[~invalid].value_counts().to_dict()
+        n_invalid = int(invalid.sum())
+        n_valid = len(data) - n_invalid
+        self.domain_counts = {key: count / n_valid for key, count in counts.items()}
+        self.pinv = n_invalid / len(data)
         self.samplesize = len(data)
+        # Keep the counts, to be able to merge
+        self.sketch = self.new_sketch()
+        self.sketch.add_counts(counts, n_invalid=n_invalid)
+
+    @classmethod
+    def build_columns(cls, data):
+        """Builds the stats of every column of a 2-D array in a single pass over all values, which is much faster than
+        building them column by column for wide data. The stats are identical to those of `build` on every column.
+
+        Parameters
+        ----------
+        data : np.ndarray
+            The values, with one column per feature.
+
+        Returns
+        -------
+        list[CategoricStats]
+            The built stats of every column.
+        """
+        data = np.asarray(data, dtype=object)
+        n, m = data.shape
+        values = data.ravel(order="F")
+        invalid = pd.isna(values)
+        n_invalid = invalid.reshape(m, n).sum(axis=1)
+        columns = np.repeat(np.arange(m), n)[~invalid]
+        codes, uniques = pd.factorize(values[~invalid])
+        # Unique (column, value) pairs, in the order they appear in every column like `value_counts` has them
+        pairs, pair_uniques = pd.factorize(columns * len(uniques) + codes)
+        counts = np.bincount(pairs, minlength=len(pair_uniques))
+        pair_columns = pair_uniques // max(len(uniques), 1)
+        pair_values = uniques[pair_uniques % max(len(uniques), 1)]
+        starts = np.searchsorted(pair_columns, np.arange(m + 1))
+
+        all_stats = []
+        for col in range(m):
+            col_counts = counts[starts[col] : starts[col + 1]]
+            col_values = pair_values[starts[col] : starts[col + 1]]
+            # Descending like `Series.sort_values`, so ties are in the same order as in `build`
+            order = np.arange(len(col_counts))[::-1][col_counts[::-1].argsort(kind="quicksort")][::-1]
+            col_counts = {col_values[idx]: int(col_counts[idx]) for idx in order}
+            col_invalid = int(n_invalid[col])
+            n_valid = n - col_invalid
+            stats = cls()
+            stats.domain_counts = {key: count / n_valid for key, count in col_counts.items()}
+            stats.pinv = col_invalid / n
+            stats.samplesize = n
+            stats.sketch = stats.new_sketch()
+            stats.sketch.add_counts(col_counts, n_invalid=col_invalid)
+            all_stats.append(stats)
+        return all_stats
+
+    def new_sketch(self):
+        """Returns an empty sketch to accumulate the stats of data in chunks, see `build_from_sketch`."""
+        return CategoricSketch()
+
+    def build_from_sketch(self, sketch):
+        """Builds the stats from a `rdv.sketch.CategoricSketch`."""
+        n_valid = sketch.count - sketch.n_invalid
+        counts = sorted(sketch.counts.items(), key=lambda item: item[1], reverse=True)
+        self.domain_counts = {key: count / n_valid for key, count in counts}
+        self.pinv = sketch.n_invalid / sketch.count
+        self.samplesize = sketch.count
+        self.sketch = sketch
+        self.bounds = None
+
+    def get_sketch(self):
+        if self.sketch is None:
+            # The counts can be recovered from the frequencies
+            return CategoricSketch.from_frequencies(self.domain_counts, pinv=self.pinv, samplesize=self.samplesize)
+        return self.sketch
 
     def is_built(self):
         return all(getattr(self, attr) is not None for attr in self._attrs)
 
+    """Likelihood"""
+
+    def likelihood(self, values):
+        """How usual every value is, between 0 and 1: the total frequency of the domain values that are at most as
+        frequent as it. 1 for the most frequent value, 0 outside the domain. NaN for None and NaN."""
+        if self._rank_table is None:
+            frequencies = np.sort(np.fromiter(self.domain_counts.values(), dtype=float, count=len(self.domain_counts)))
+            total = max(frequencies.sum(), np.finfo(float).tiny)
+            self._rank_table = (frequencies, np.concatenate([[0.0], np.cumsum(frequencies) / total]))
+        frequencies, cumulative = self._rank_table
+        values = pd.Series(np.asarray(values, dtype=object))
+        invalid = pd.isnull(values).values
+        # Values outside the domain have a frequency of 0
+        value_frequencies = values.map(self.domain_counts).fillna(0.0).values.astype(float)
+        lh = cumulative[np.searchsorted(frequencies, value_frequencies, side="right")]
+        return np.where(invalid, np.nan, lh)
+
     """Testing and sampling functions"""
 
     def test_drift(self, other, pthresh=0.05):
-        domain_f1, domain_f2, full_domain = equalize_domains(self.domain_counts, other.domain_counts)
-        sample_size = min(self.samplesize, other.samplesize)
-        sampled_1 = self.sample_counts(domain_f1, keys=full_domain, n=sample_size)
-        sampled_2 = self.sample_counts(domain_f2, keys=full_domain, n=sample_size)
+        """Chi-squared test of homogeneity between these stats and `other`, computed from the domain frequencies and
+        the sample sizes, see `rdv.drift`.
+
+        Returns
+        -------
+        stat : float
+            The chi-squared statistic.
+        pvalue : float
+            Its p-value.
+        drift : bool
+            Whether the p-value is below `pthresh`.
+        """
+        stat, pvalue, drift = drift_batch([(self, other)], pthresh=pthresh)
+        return float(stat[0]), float(pvalue[0]), bool(drift[0])
 
-        stat, pvalue = chisquare(f_obs=sampled_1, f_exp=sampled_2)
-        drift = pvalue < pthresh
-        return stat, pvalue, drift
+    @property
+    def n_valid(self):
+        """The number of valid values the stats were built on."""
+        return self.samplesize * (1 - self.pinv)
 
-    def sample(self, n):
-        domain = sorted(list(self.domain_counts.keys()))
-        # Let's be absolutely sure the domain is always in the same order
-        p = [self.domain_counts[k] for k in domain]
-        return np.random.choice(a=domain, size=n, p=p)
+    @property
+    def sampler(self):
+        """The `rdv.sampler.CategoricSampler` of the stats, kept until they are built again."""
+        if self._sampler is None:
+            self._sampler = CategoricSampler(self.domain_counts)
+        return self._sampler
+
+    def sample(self, n=1000, seed=None):
+        """Draws `n` domain values by their frequency. Successive draws continue the random generator of the sampler,
+        unless a `seed` is given."""
+        rng = None if seed is None else np.random.default_rng(seed)
+        return self.sampler.sample(n=n, rng=rng)
 
     def sample_counts(self, domain_freq, keys, n=1000):
         domain = sorted(list(keys))
@@ -288,11 +671,112 @@ class CategoricStats(Stats):
         return counts
 
 
+def combine_likelihoods(likelihoods):
+    """Combines the likelihoods of the features of every data instance into one global likelihood, with Fisher's
+    method: under the data the stats were built on, -2 times the sum of the log likelihoods of k features follows a
+    chi-squared distribution with 2k degrees of freedom.
+
+    Parameters
+    ----------
+    likelihoods : array-like
+        The likelihoods, one row per data instance and one column per feature. NaN for features without one.
+
+    Returns
+    -------
+    np.ndarray
+        The global likelihood of every data instance, NaN if none of its features has a likelihood.
+    """
+    likelihoods = np.atleast_2d(np.asarray(likelihoods, dtype=float))
+    valid = ~np.isnan(likelihoods)
+    with np.errstate(divide="ignore"):
+        statistic = -2 * np.where(valid, np.log(likelihoods), 0).sum(axis=1)
+    dof = 2 * valid.sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        combined = chi2.sf(statistic, np.maximum(dof, 1))
+    return np.where(dof > 0, combined, np.nan)
+
+
+def drift_batch(pairs, pthresh=0.05):
+    """Tests drift between many pairs of stats at once, with one vectorized test for all numeric pairs and one for all
+    categoric pairs, see `rdv.drift`.
+
+    Parameters
+    ----------
+    pairs : list[tuple[Stats, Stats]]
+        The pairs of stats of the same feature, built on different data.
+    pthresh : float, optional
+        The p-value below which a pair has drifted, by default 0.05
+
+    Returns
+    -------
+    stat, pvalue, drift : np.ndarray
+        The test statistic, its p-value and whether it drifted, for every pair.
+    """
+    stat, pvalue = np.zeros(len(pairs)), np.ones(len(pairs))
+    numeric, categoric = [], []
+    for idx, (a, b) in enumerate(pairs):
+        if type(a) is not type(b):
+            raise DataException(f"Cannot test drift between {type(a).__name__} and {type(b).__name__}")
+        if not (a.is_built() and b.is_built()):
+            raise DataException("Cannot test drift between stats that are not built")
+        if isinstance(a, NumericStats):
+            numeric.append(idx)
+        elif isinstance(a, CategoricStats):
+            categoric.append(idx)
+        else:
+            raise DataException(f"Cannot test drift between {type(a).__name__}")
+
+    if len(numeric) > 0:
+        stat[numeric], pvalue[numeric] = ks_drift(
+            [pairs[idx][0].percentiles for idx in numeric],
+            [pairs[idx][1].percentiles for idx in numeric],
+            n_a=[pairs[idx][0].n_valid for idx in numeric],
+            n_b=[pairs[idx][1].n_valid for idx in numeric],
+        )
+    if len(categoric) > 0:
+        domains = [list({**pairs[idx][0].domain_counts, **pairs[idx][1].domain_counts}) for idx in categoric]
+        counts = np.zeros((2, len(categoric), max(len(domain) for domain in domains)))
+        for row, (idx, domain) in enumerate(zip(categoric, domains)):
+            for side, stats in enumerate(pairs[idx]):
+                counts[side, row, : len(domain)] = [stats.domain_counts.get(key, 0) * stats.n_valid for key in domain]
+        stat[categoric], pvalue[categoric] = chi2_drift(counts[0], counts[1])
+    return stat, pvalue, pvalue < pthresh
+
+
+def sample_batch(stats, n=1000, seed=DEFAULT_SEED):
+    """Draws `n` values from every stats at once, with one random generator. The numeric stats are sampled together in
+    a single vectorized draw.
+
+    Parameters
+    ----------
+    stats : list[Stats]
+        The built stats to sample from.
+    n : int, optional
+        The number of values drawn from every stats, by default 1000
+    seed : int, optional
+        The seed of the random generator, by default 0
+
+    Returns
+    -------
+    list[np.ndarray]
+        The values drawn from every stats, in the order of `stats`.
+    """
+    rng = np.random.default_rng(seed)
+    samples = [None] * len(stats)
+    numeric = [idx for idx, s in enumerate(stats) if isinstance(s, NumericStats)]
+    if len(numeric) > 0:
+        values = NumericSampler.sample_many([stats[idx].sampler for idx in numeric], n=n, rng=rng)
+        for idx, row in zip(numeric, values):
+            samples[idx] = row
+    for idx, s in enumerate(stats):
+        if samples[idx] is None:
+            samples[idx] = s.sampler.sample(n=n, rng=rng)
+    return samples
+
+
 def add_missing(domain_counts, full_domain):
-    for key in full_domain:
-        if key not in domain_counts:
-            domain_counts[key] = 0
-    return domain_counts
+    """Returns a copy of `domain_counts` with a count of 0 for the keys of `full_domain` it is missing."""
+    return {**domain_counts, **{key: 0 for key in full_domain if key not in domain_counts}}
 
 
 def equalize_domains(a, b):
@@ -0,0 +1,64 @@
+import time
+from itertools import islice
+
+import pandas as pd
+
+
+class StreamProgress:
+    """Progress and throughput counters of a stream of data that is being processed chunk by chunk."""
+
+    def __init__(self):
+        self.n_samples = 0
+        self.n_chunks = 0
+        self.start_time = time.perf_counter()
+        self.last_chunk_time = 0.0
+        self.last_chunk_size = 0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    @property
+    def throughput(self):
+        """Average number of samples processed per second."""
+        elapsed = self.elapsed
+        return self.n_samples / elapsed if elapsed > 0 else 0.0
+
+    def update(self, chunk_size, chunk_time):
+        self.n_samples += chunk_size
+        self.n_chunks += 1
+        self.last_chunk_size = chunk_size
+        self.last_chunk_time = chunk_time
+
+    def __str__(self):
+        return f"{self.n_samples} samples in {self.n_chunks} chunks, {self.throughput:.1f} samples/s"
+
+    def __repr__(self):
+        return f"StreamProgress(n_samples={self.n_samples}, n_chunks={self.n_chunks}, elapsed={self.elapsed:.3f})"
+
+
+def chunked(iterable, chunk_size):
+    """Splits an iterable in lists of at most `chunk_size` items, consuming it lazily. DataFrames are split in slices of
+    at most `chunk_size` rows instead."""
+    if not (isinstance(chunk_size, int) and chunk_size > 0):
+        raise ValueError(f"chunk_size must be an int > 0, not {chunk_size}")
+    if isinstance(iterable, pd.DataFrame):
+        for start in range(0, len(iterable), chunk_size):
+            yield iterable.iloc[start : start + chunk_size]
+        return
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def to_batch(chunk):
+    """Converts a chunk of structured samples (Series or dicts) to a DataFrame, so it can be checked column-wise.
+    Other chunks, like DataFrames, are returned as is."""
+    if isinstance(chunk, pd.DataFrame):
+        return chunk
+    if all(isinstance(sample, pd.Series) for sample in chunk) or all(isinstance(sample, dict) for sample in chunk):
+        return pd.DataFrame(list(chunk))
+    return chunk
@@ -1,5 +1,8 @@
+import sys
 from enum import Enum
 
+import numpy as np
+
 from rdv.globals import Serializable
 
 
@@ -7,18 +10,27 @@ SCHEMA_ERROR = "schema-error"
 SCHEMA_FEATURE = "schema-feature"
 SCHEMA_FEATURE_LH = "schema-feature-lh"
 SCHEMA_GLOBAL_LH = "schema-global-lh"
+SCHEMA_SKIPPED = "schema-skipped"
 LABEL = "label"
 METRIC = "metric"
 VECTOR = "vector"
 ERROR = "error"
 
+# Values of the schema error tags. Columnar results refer to them by their index.
+ERROR_VALUES = ("Value None", "Value NaN", "Value > max", "Value < min", "Domain Error")
+NO_ERROR = -1
+
 
 class Tag(Serializable):
+    # Tags are created for every feature of every checked sample, so keep them compact. Names and groups repeat a lot
+    # between tags and are interned.
+    __slots__ = ("name", "value", "type", "group")
+
     def __init__(self, name, value, type, group=None):
-        self.name = name
+        self.name = sys.intern(name) if name.__class__ is str else name
         self.value = value
         self.type = type
-        self.group = group
+        self.group = sys.intern(group) if group.__class__ is str else group
 
     def to_jcr(self):
         jcr = {
@@ -38,3 +50,98 @@ class Tag(Serializable):
 
     def __repr__(self):
         return f"Tag(name='{self.name}, value={self.value}, type={self.type}, group={self.group}"
+
+
+class ColumnarTags:
+    """Tags of one or more checked data instances, stored as parallel arrays instead of one object per tag.
+
+    Every tag is a row in the arrays `samples` (index of the data instance in the batch), `features` (index in the
+    `names` table), `values` (the feature value, None for error tags) and `errors` (index in `ERROR_VALUES`, or
+    `NO_ERROR` for feature tags). Names and group are stored once and are only expanded when the tags are converted to
+    `Tag` objects or their JSON compatible representation.
+    """
+
+    def __init__(self, names, group, n_samples, samples, features, values, errors):
+        self.names = tuple(names)
+        self.group = group
+        self.n_samples = n_samples
+        self.samples = samples
+        self.features = features
+        self.values = values
+        self.errors = errors
+
+    @classmethod
+    def from_columns(cls, names, group, columns):
+        """Constructs the tags from per-feature check results, as returned by `Feature.check_columns`.
+
+        Parameters
+        ----------
+        names : list[str]
+            The feature names.
+        group : str
+            The group of all tags.
+        columns : list[tuple]
+            For every feature, the `values`, `valid` and `errors` arrays for all data instances.
+        """
+        n_samples = len(columns[0][0]) if len(columns) > 0 else 0
+        all_values = np.empty((n_samples, len(columns)), dtype=object)
+        all_errors = np.full((n_samples, len(columns)), NO_ERROR, dtype=np.int8)
+        # Per instance and feature, there is room for a feature tag and an error tag
+        present = np.zeros((n_samples, len(columns), 2), dtype=bool)
+        for idx, (values, valid, errors) in enumerate(columns):
+            all_values[:, idx] = values.tolist()
+            all_errors[:, idx] = errors
+            present[:, idx, 0] = valid
+            present[:, idx, 1] = errors != NO_ERROR
+        # nonzero returns the indices in (instance, feature, feature tag before error tag) order
+        samples, features, is_error = np.nonzero(present)
+        is_error = is_error.astype(bool)
+        values = all_values[samples, features]
+        values[is_error] = None
+        errors = np.where(is_error, all_errors[samples, features], NO_ERROR).astype(np.int8)
+        return cls(
+            names=names,
+            group=group,
+            n_samples=n_samples,
+            samples=samples,
+            features=features,
+            values=values,
+            errors=errors,
+        )
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __repr__(self):
+        return f"ColumnarTags(n_samples={self.n_samples}, n_tags={len(self)}, group={self.group})"
+
+    def tag(self, idx):
+        """Returns the tag at row `idx` as a `Tag` object."""
+        name = self.names[self.features[idx]]
+        error = self.errors[idx]
+        if error == NO_ERROR:
+            return Tag(name=name, value=self.values[idx], type=SCHEMA_FEATURE, group=self.group)
+        return Tag(name=f"{name}-err", value=ERROR_VALUES[error], type=SCHEMA_ERROR, group=self.group)
+
+    def to_tags(self):
+        """Converts to `Tag` objects.
+
+        Returns
+        -------
+        tags : list[list[Tag]]
+            For every data instance, its list of tags.
+        """
+        tags = [[] for _ in range(self.n_samples)]
+        for idx, sample in enumerate(self.samples):
+            tags[sample].append(self.tag(idx))
+        return tags
+
+    def to_jcr(self):
+        """Converts to the JSON compatible representation of the tags, the same as returned by `Schema.check`.
+
+        Returns
+        -------
+        tags : list[list[dict]]
+            For every data instance, its list of tags.
+        """
+        return [[tag.to_jcr() for tag in tags] for tags in self.to_tags()]
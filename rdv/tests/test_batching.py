@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import rdv.extractors.vision.dn2 as dn2
+from rdv.batching import MicroBatcher
+
+DATA_PATH = Path(__file__).parents[2] / "examples/data_sample"
+
+
+def test_microbatcher_threads():
+    batch_sizes = []
+
+    def batch_fn(items):
+        batch_sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_latency=0.05)
+    results = {}
+
+    def client(idx):
+        results[idx] = batcher.submit(idx).result()
+
+    threads = [threading.Thread(target=client, args=(idx,)) for idx in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    assert results == {idx: idx * 2 for idx in range(32)}
+    assert sum(batch_sizes) == 32
+    assert max(batch_sizes) <= 8
+    assert len(batch_sizes) < 32
+    assert batcher.n_items == 32
+
+
+def test_microbatcher_asyncio():
+    batcher = MicroBatcher(lambda items: [item + 1 for item in items], max_batch_size=4, max_latency=0.01)
+
+    async def run():
+        return await asyncio.gather(*[batcher.asubmit(idx) for idx in range(10)])
+
+    assert asyncio.run(run()) == list(range(1, 11))
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
+
+
+def test_microbatcher_exception():
+    def batch_fn(items):
+        raise ValueError("Invalid batch")
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_latency=0)
+    with pytest.raises(ValueError):
+        batcher.submit(1).result()
+    batcher.close()
+
+
+def test_microbatcher_close_concurrent():
+    for _ in range(5):
+        batcher = MicroBatcher(lambda items: items, max_batch_size=4, max_latency=0.001)
+        put = batcher._queue.put
+
+        def slow_put(entry):
+            # Widens the window between accepting an item and queueing it
+            if entry is not None:
+                time.sleep(0.001)
+            put(entry)
+
+        batcher._queue.put = slow_put
+        futures = []
+        start = threading.Barrier(5)
+
+        def client():
+            start.wait()
+            for idx in range(200):
+                try:
+                    futures.append(batcher.submit(idx))
+                except RuntimeError:
+                    return
+
+        threads = [threading.Thread(target=client) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        time.sleep(0.005)
+        batcher.close()
+        for thread in threads:
+            thread.join()
+        # Every accepted item was processed before the worker stopped
+        assert all(future.done() for future in futures)
+        assert batcher.n_items == len(futures)
+
+
+def test_dn2_extract_batch(monkeypatch):
+    # Random weights, the pretrained ones need a download
+    mobilenet_v2 = dn2.models.mobilenet_v2
+    monkeypatch.setattr(dn2.models, "mobilenet_v2", lambda pretrained=False: mobilenet_v2())
+    fpaths = sorted((DATA_PATH / "castinginspection/ok_front").glob("*.jpeg"))[:4]
+    images = [Image.open(fpath).convert("RGB") for fpath in fpaths]
+    # Images of another size are scored in their own forward pass
+    images.insert(1, images[0].resize((64, 48)))
+    extractor = dn2.DN2OutlierScorer(k=2, clusters=np.random.default_rng(0).normal(size=(2, 1000)))
+    extractor.max_batch_size = 2
+    forward = extractor.mobilenet.forward
+    batch_sizes = []
+
+    def counted(batch):
+        batch_sizes.append(len(batch))
+        return forward(batch)
+
+    monkeypatch.setattr(extractor.mobilenet, "forward", counted)
+    scores = extractor.extract_batch(images)
+    assert sorted(batch_sizes) == [1, 2, 2]
+    batch_sizes.clear()
+    expected = [extractor.extract_feature(img) for img in images]
+    assert scores == pytest.approx(expected, rel=1e-4)
@@ -1,10 +1,18 @@
 import pytest
 import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
 from rdv.schema import Schema
 from rdv.feature import FloatFeature
-from rdv.stats import NumericStats, CategoricStats
+from rdv.stats import NumericStats, CategoricStats, sorted_percentiles
+from rdv.extractors.structured import construct_features
 from rdv.extractors.vision.similarity import FixedSubpatchSimilarity
 
+DATA_PATH = Path(__file__).parents[2] / "examples/data_sample"
+
 
 def test_stats_none():
     stats = NumericStats()
@@ -116,3 +124,30 @@ def test_schema_buildable():
     schema = Schema(name="Testing", version="1.0.0", features=[component, component])
 
     assert schema.is_built()
+
+
+def test_sorted_percentiles():
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(500, 20)) * 10.0 ** rng.integers(-3, 6, size=20)
+    n_valid = rng.integers(1, 501, size=20)
+    for j, n in enumerate(n_valid):
+        data[n:, j] = np.nan
+    percentiles = sorted_percentiles(np.sort(data, axis=0), n_valid)
+    for j, n in enumerate(n_valid):
+        assert np.array_equal(percentiles[:, j], np.percentile(data[:n, j], np.arange(101)))
+
+
+def test_from_dataframe():
+    data = pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+    rng = np.random.default_rng(0)
+    data["sparse"] = np.where(rng.random(len(data)) < 0.5, np.nan, rng.normal(size=len(data)))
+    data["letters"] = pd.Series(rng.choice(list("abc"), size=len(data)), dtype=object).where(
+        rng.random(len(data)) < 0.9
+    )
+
+    schema = Schema.from_dataframe(data, name="houseprices")
+    reference = Schema(name="houseprices", features=construct_features(data.dtypes))
+    reference.build(data)
+    assert schema.is_built()
+    # Identical, down to the order of the domains and the sketches
+    assert json.dumps(schema.to_jcr(include_sketch=True)) == json.dumps(reference.to_jcr(include_sketch=True))
@@ -0,0 +1,107 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from rdv.schema import Schema
+from rdv.cache import FeatureCache, fingerprint_data
+from rdv.feature import FloatFeature
+from rdv.extractors.structured import KMeansOutlierScorer
+from rdv.extractors.vision import AvgIntensity, Sharpness
+
+DATA_PATH = Path(__file__).parents[2] / "examples/data_sample"
+
+
+def load_images(n=8):
+    fpaths = sorted((DATA_PATH / "castinginspection/ok_front").glob("*.jpeg"))[:n]
+    return [Image.open(fpath).convert("RGB") for fpath in fpaths]
+
+
+def test_fingerprint_data():
+    images = load_images(n=2)
+    assert fingerprint_data(images) == fingerprint_data(load_images(n=2))
+    assert fingerprint_data(images) != fingerprint_data(images[::-1])
+    data = pd.DataFrame({"a": [1.0, 2.0], "b": ["x", "y"]})
+    assert fingerprint_data(data) == fingerprint_data(data.copy())
+    assert fingerprint_data(data) != fingerprint_data(data.rename(columns={"a": "c"}))
+    assert fingerprint_data(np.arange(4)) != fingerprint_data(np.arange(4).reshape(2, 2))
+
+
+def test_build_cached(tmp_path, monkeypatch):
+    images = load_images()
+    cache = FeatureCache(tmp_path)
+    schema = Schema(features=[FloatFeature(name="sharpness", extractor=Sharpness())])
+    schema.build(images, cache=cache)
+    assert len(cache) == 1
+
+    def fail(self, data):
+        raise AssertionError("Cached features should not be extracted again")
+
+    # Only the new feature is extracted
+    monkeypatch.setattr(Sharpness, "extract_feature", fail)
+    rebuilt = Schema(
+        features=[
+            FloatFeature(name="sharpness", extractor=Sharpness()),
+            FloatFeature(name="intensity", extractor=AvgIntensity()),
+        ]
+    )
+    rebuilt.build(images, cache=cache)
+    assert len(cache) == 2
+    assert rebuilt.is_built()
+    assert rebuilt.features["sharpness"].stats.to_jcr() == schema.features["sharpness"].stats.to_jcr()
+
+    # Other data is not served from the cache
+    monkeypatch.undo()
+    other = Schema(features=[FloatFeature(name="sharpness", extractor=Sharpness())])
+    other.build(images[:4], cache=cache)
+    assert len(cache) == 3
+
+
+def test_build_cached_extractor_state(tmp_path):
+    data = np.random.default_rng(0).normal(size=(100, 4))
+    cache = FeatureCache(tmp_path)
+    schema = Schema(features=[FloatFeature(name="kmeans", extractor=KMeansOutlierScorer(k=3))])
+    schema.build(list(data), cache=cache)
+    rebuilt = Schema(features=[FloatFeature(name="kmeans", extractor=KMeansOutlierScorer(k=3))])
+    rebuilt.build(list(data), cache=cache)
+    # The built clusters are restored along with the values
+    assert np.array_equal(rebuilt.features["kmeans"].extractor.clusters, schema.features["kmeans"].extractor.clusters)
+    assert rebuilt.check(data[0]) == schema.check(data[0])
+
+
+def test_rebuild_cached(tmp_path, monkeypatch):
+    data = list(np.random.default_rng(0).normal(size=(100, 4)))
+    cache = FeatureCache(tmp_path)
+    schema = Schema(
+        features=[
+            FloatFeature(name="k3", extractor=KMeansOutlierScorer(k=3)),
+            FloatFeature(name="k4", extractor=KMeansOutlierScorer(k=4)),
+        ]
+    )
+    schema.build(data, cache=cache)
+    expected = schema.features["k3"].stats.to_jcr()
+
+    def fail(self, data):
+        raise AssertionError("Cached features should not be built or extracted again")
+
+    # The built clusters are not part of the key, so rebuilding the same schema hits the cache
+    monkeypatch.setattr(KMeansOutlierScorer, "build", fail)
+    monkeypatch.setattr(KMeansOutlierScorer, "extract_feature", fail)
+    monkeypatch.setattr(KMeansOutlierScorer, "extract_batch", fail)
+    schema.drop_feature("k4")
+    schema.build(data, cache=cache)
+    assert len(cache) == 2
+    assert schema.features["k3"].stats.to_jcr() == expected
+
+
+def test_cache_eviction(tmp_path):
+    cache = FeatureCache(tmp_path, max_size=10000)
+    extractor = Sharpness()
+    for i in range(10):
+        cache.put(cache.key(str(i), extractor), extractor.to_jcr(), np.arange(300, dtype=float))
+    assert 0 < cache.size <= 10000
+    assert len(cache) < 10
+    # The most recent entry is kept, the oldest is evicted
+    assert cache.get(cache.key("9", extractor)) is not None
+    assert cache.get(cache.key("0", extractor)) is None
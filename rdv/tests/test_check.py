@@ -1,14 +1,26 @@
 import pytest
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
+from PIL import Image
 import pandas as pd
 import numpy as np
 
 import rdv
-from rdv.extractors.structured import construct_features
-from rdv.feature import CategoricFeature, FloatFeature
+from rdv.extractors.structured import construct_features, ElementExtractor
+from rdv.extractors.structured.kmeans import KMeansOutlierScorer
+from rdv.extractors.vision import Sharpness, AvgIntensity
+from rdv.extractors import FeatureExtractor
+from rdv.extractors.shared import sample_cache
+from rdv.feature import CategoricFeature, Feature, FloatFeature
 from rdv.schema import Schema
 from rdv.globals import SchemaStateException, DataException
 from rdv.stats import NumericStats, CategoricStats
+from rdv.tags import SCHEMA_ERROR, SCHEMA_FEATURE, SCHEMA_FEATURE_LH, SCHEMA_GLOBAL_LH, Tag
+
+DATA_PATH = Path(__file__).parents[2] / "examples/data_sample"
 
 
 def test_compile_nan():
@@ -51,3 +63,526 @@ def test_compile_nan_2():
     assert tags[1]["name"] == "cat1"
     assert tags[1]["value"] == "b"
     assert tags[1]["group"] == "default@0.0.0"
+
+
+def test_check_batch():
+    cols = {
+        "num1": list(range(10)),
+        "num2": [0.5] * 9 + [np.nan],
+        "cat1": ["a"] * 5 + ["b"] * 5,
+    }
+    df = pd.DataFrame(data=cols)
+    schema = Schema(features=construct_features(dtypes=df.dtypes))
+    schema.build(data=df)
+
+    checkdata = pd.DataFrame(
+        data={
+            "num1": [-1, 5, 12, 3],
+            "num2": [0.5, np.nan, 0.6, 0.4],
+            "cat1": ["a", "c", np.nan, None],
+        }
+    )
+    batch_tags = schema.check_batch(checkdata)
+    assert len(batch_tags) == len(checkdata)
+    for (_, row), tags in zip(checkdata.iterrows(), batch_tags):
+        assert tags == schema.check(row)
+
+
+class LegacyFloatFeature(FloatFeature):
+    # A feature written before validate_batch, relying on the default
+    validate_batch = Feature.validate_batch
+
+
+def test_check_batch_default_validation():
+    schema = Schema(
+        features=[
+            LegacyFloatFeature(name="num1", extractor=ElementExtractor(element="num1")),
+            FloatFeature(name="num2", extractor=ElementExtractor(element="num2")),
+        ]
+    )
+    schema.build(data=pd.DataFrame({"num1": np.arange(10.0), "num2": np.arange(10.0)}))
+    checkdata = pd.DataFrame({"num1": [-1, 5, np.nan, None], "num2": [-1, 5, np.nan, None]})
+    batch_tags = schema.check_batch(checkdata)
+    for (_, row), tags in zip(checkdata.iterrows(), batch_tags):
+        assert tags == schema.check(row)
+    # Both features are validated alike
+    assert schema.features["num1"].check_columns(checkdata)[2].tolist() == [3, -1, 1, 1]
+    assert schema.features["num2"].check_columns(checkdata)[2].tolist() == [3, -1, 1, 1]
+
+
+class LegacyTagFeature(FloatFeature):
+    # Overrides written before tags got their group when created
+    def feature2tag(self, feature):
+        return super().feature2tag(feature)
+
+    def check_invalid(self, feature):
+        return super().check_invalid(feature)
+
+
+def test_check_legacy_overrides():
+    data = pd.DataFrame({"num1": np.arange(10.0)})
+    schema = Schema(features=[LegacyTagFeature(name="num1", extractor=ElementExtractor(element="num1"))])
+    schema.build(data=data)
+    tags = schema.check(pd.Series({"num1": 20.0}))
+    assert [tag["group"] for tag in tags] == [schema.group_idfr] * 2
+    with pytest.warns(DeprecationWarning):
+        schema.set_schema_group([])
+
+
+def test_check_batch_houseprices():
+    data = pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+    schema = Schema(features=construct_features(dtypes=data.dtypes))
+    schema.build(data=data.iloc[:500])
+
+    checkdata = data.iloc[500:600]
+    batch_tags = schema.check_batch(checkdata)
+    for (_, row), tags in zip(checkdata.iterrows(), batch_tags):
+        assert tags == schema.check(row)
+
+    arr = checkdata.select_dtypes("number").values
+    arr_schema = Schema(features=[FloatFeature(name="col0", extractor=ElementExtractor(element=0))])
+    arr_schema.build(data=data.select_dtypes("number").values.T)
+    batch_tags = arr_schema.check_batch(arr)
+    assert batch_tags == [arr_schema.check(row) for row in arr]
+
+
+def test_compiled_check():
+    data = pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+    schema = Schema(features=construct_features(dtypes=data.dtypes))
+    schema.build(data=data.iloc[:500])
+    compiled = schema.compile()
+
+    for _, row in data.iloc[500:600].iterrows():
+        assert compiled.check(row) == schema.check(row)
+        assert [t.to_jcr() for t in compiled.check(row, convert_json=False)] == schema.check(row)
+
+
+class PositiveFeature(FloatFeature):
+    # Customizes its error tags
+    def check_invalid(self, feature, *, group=None):
+        if feature is not None and feature < 0:
+            return Tag(name=self.errname, value="Value < 0", type=SCHEMA_ERROR, group=group)
+        return super().check_invalid(feature, group=group)
+
+
+def test_compiled_check_overrides():
+    data = pd.DataFrame({"num1": np.arange(-5.0, 5.0), "num2": np.arange(-5.0, 5.0), "num3": np.arange(-5.0, 5.0)})
+    schema = Schema(
+        features=[
+            PositiveFeature(name="num1", extractor=ElementExtractor(element="num1")),
+            LegacyTagFeature(name="num2", extractor=ElementExtractor(element="num2")),
+            FloatFeature(name="num3", extractor=ElementExtractor(element="num3")),
+        ]
+    )
+    schema.build(data=data)
+    compiled = schema.compile()
+    for _, row in data.iterrows():
+        assert compiled.check(row) == schema.check(row)
+    assert {"name": "num1-err", "value": "Value < 0", "type": SCHEMA_ERROR, "group": schema.group_idfr} in (
+        compiled.check(data.iloc[0])
+    )
+
+
+def test_compile_unbuilt():
+    schema = Schema(features=[FloatFeature(name="num1", extractor=ElementExtractor(element="num1"))])
+    with pytest.raises(SchemaStateException):
+        schema.compile()
+
+
+def test_check_columnar():
+    data = pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+    schema = Schema(features=construct_features(dtypes=data.dtypes))
+    schema.build(data=data.iloc[:500])
+
+    checkdata = data.iloc[500:600]
+    columnar = schema.check_batch(checkdata, columnar=True)
+    assert columnar.n_samples == len(checkdata)
+    assert columnar.to_jcr() == schema.check_batch(checkdata)
+    assert len(columnar) == sum(len(tags) for tags in columnar.to_tags())
+
+    row = checkdata.iloc[0]
+    columnar = schema.check(row, columnar=True)
+    assert columnar.n_samples == 1
+    assert columnar.to_jcr()[0] == schema.check(row)
+
+
+class ThreadRecordingExtractor(ElementExtractor):
+    cost = 100
+
+    def __init__(self, element):
+        super().__init__(element=element)
+        self.threads = []
+
+    def extract_feature(self, data):
+        self.threads.append(threading.get_ident())
+        return super().extract_feature(data)
+
+
+def test_acheck():
+    cols = {
+        "num1": list(range(10)),
+        "cat1": ["a"] * 5 + ["b"] * 5,
+    }
+    df = pd.DataFrame(data=cols)
+    heavy = ThreadRecordingExtractor(element="num1")
+    schema = Schema(features=construct_features(dtypes=df.dtypes) + [FloatFeature(name="heavy", extractor=heavy)])
+    schema.build(data=df)
+
+    row = pd.Series([12, "c"], index=["num1", "cat1"])
+    heavy.threads = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        tags = asyncio.run(schema.acheck(row, executor=executor))
+    assert tags == schema.check(row)
+    assert heavy.threads[0] != threading.get_ident()
+
+
+def test_check_parallel():
+    cols = {
+        "num1": list(range(10)),
+        "cat1": ["a"] * 5 + ["b"] * 5,
+    }
+    df = pd.DataFrame(data=cols)
+    heavy = ThreadRecordingExtractor(element="num1")
+    features = [FloatFeature(name="heavy", extractor=heavy)] + construct_features(dtypes=df.dtypes)
+    schema = Schema(features=features)
+    schema.build(data=df, parallel=True)
+    assert schema.is_built()
+    assert schema.features["heavy"].stats.max == 9
+
+    row = pd.Series([12, "c"], index=["num1", "cat1"])
+    heavy.threads = []
+    tags = schema.check(row, parallel=True)
+    assert tags == schema.check(row)
+    assert heavy.threads[0] != threading.get_ident()
+    assert [tag["name"] for tag in tags] == ["heavy", "heavy-err", "num1", "num1-err", "cat1", "cat1-err"]
+
+
+def test_check_fail_fast():
+    cols = {
+        "num1": list(range(10)),
+        "cat1": ["a"] * 5 + ["b"] * 5,
+    }
+    df = pd.DataFrame(data=cols)
+    heavy = ThreadRecordingExtractor(element="num1")
+    features = [FloatFeature(name="heavy", extractor=heavy)] + construct_features(dtypes=df.dtypes)
+    schema = Schema(features=features)
+    schema.build(data=df)
+
+    tags = schema.check(pd.Series([3, "a"], index=["num1", "cat1"]), features=["cat1", "num1"])
+    assert [tag["name"] for tag in tags] == ["cat1", "num1"]
+
+    heavy.threads = []
+    row = pd.Series([12, "a"], index=["num1", "cat1"])
+    tags = schema.check(row, order="cost", fail_fast=True)
+    assert [(tag["name"], tag["type"]) for tag in tags] == [
+        ("num1", "schema-feature"),
+        ("num1-err", "schema-error"),
+        ("cat1", "schema-skipped"),
+        ("heavy", "schema-skipped"),
+    ]
+    assert heavy.threads == []
+
+    tags = schema.check(row, order=["cat1"], fail_fast=True)
+    assert [tag["name"] for tag in tags] == ["cat1", "heavy", "heavy-err", "num1"]
+    with pytest.raises(ValueError):
+        schema.check(row, features=["unknown"])
+
+
+def test_check_shared_intermediates():
+    fpaths = sorted((DATA_PATH / "castinginspection/ok_front").glob("*.jpeg"))[:10]
+    images = [Image.open(fpath) for fpath in fpaths]
+    schema = Schema(
+        features=[
+            FloatFeature(name="sharpness", extractor=Sharpness()),
+            FloatFeature(name="intensity", extractor=AvgIntensity()),
+            FloatFeature(name="sharpness2", extractor=Sharpness()),
+        ]
+    )
+    schema.build(data=images)
+
+    img = images[0]
+    with sample_cache() as cache:
+        for feature in schema.features.values():
+            feature.check(img)
+    # grayscale, grayscale array and one extracted value per distinct extractor
+    assert len(cache) == 4
+
+    compiled = schema.compile()
+    # Both sharpness features share an extractor
+    assert compiled._plan[0][1] == compiled._plan[2][1]
+    for img in images:
+        assert compiled.check(img) == schema.check(img)
+        assert schema.check(img) == [
+            tag.to_jcr() for feat in schema.features.values() for tag in feat.check(img, group=schema.group_idfr)
+        ]
+
+
+def test_check_shared_extractors(monkeypatch):
+    fpaths = sorted((DATA_PATH / "castinginspection/ok_front").glob("*.jpeg"))[:4]
+    images = [Image.open(fpath) for fpath in fpaths]
+    schema = Schema(
+        features=[
+            FloatFeature(name="sharpness", extractor=Sharpness()),
+            FloatFeature(name="sharpness2", extractor=Sharpness()),
+        ]
+    )
+    schema.build(data=images)
+    extract_feature = Sharpness.extract_feature
+    calls = []
+
+    def counted(self, data):
+        calls.append(self)
+        return extract_feature(self, data)
+
+    monkeypatch.setattr(Sharpness, "extract_feature", counted)
+    tags = schema.check(images[0])
+    # Separate but equal extractors extract once per sample
+    assert len(calls) == 1
+    assert tags[0]["value"] == tags[1]["value"]
+
+
+class ScaledExtractor(FeatureExtractor):
+    # Leaves its scale out of its state, like custom extractors may
+    cost = 1
+
+    def __init__(self, scale=1.0):
+        self.scale = scale
+
+    def extract_feature(self, data):
+        return float(data.sum()) * self.scale
+
+    def to_jcr(self):
+        return {}
+
+    @classmethod
+    def from_jcr(cls, jcr):
+        return cls()
+
+    def build(self, data):
+        pass
+
+    def is_built(self):
+        return True
+
+
+def test_check_shared_extractors_state():
+    rng = np.random.default_rng(0)
+    data = list(rng.normal(size=(50, 3)))
+    clusters = rng.normal(size=(2, 3))
+    first = FloatFeature(name="first", extractor=KMeansOutlierScorer(k=2, clusters=clusters))
+    second = FloatFeature(name="second", extractor=KMeansOutlierScorer(k=2, clusters=clusters))
+    with sample_cache():
+        assert first.extract(data[0]) == second.extract(data[0])
+    # Changed after the key was first used
+    second.extractor.clusters = clusters + 1
+    with sample_cache():
+        assert first.extract(data[0]) != second.extract(data[0])
+        assert second.extract(data[0]) == second.extractor.extract_feature(data[0])
+
+    # Extractors that do not opt in are only shared with themselves
+    schema = Schema(
+        features=[
+            FloatFeature(name="single", extractor=ScaledExtractor()),
+            FloatFeature(name="double", extractor=ScaledExtractor(scale=2.0)),
+        ]
+    )
+    schema.build(data=data)
+    tags = schema.check(data[0])
+    assert tags[1]["value"] == 2 * tags[0]["value"]
+    assert schema.compile().check(data[0]) == tags
+
+
+def test_build_fused():
+    fpaths = sorted((DATA_PATH / "castinginspection/ok_front").glob("*.jpeg"))[:10]
+    images = [Image.open(fpath) for fpath in fpaths]
+
+    def make_schema():
+        return Schema(
+            features=[
+                FloatFeature(name="sharpness", extractor=Sharpness()),
+                FloatFeature(name="intensity", extractor=AvgIntensity()),
+            ]
+        )
+
+    fused = make_schema()
+    fused.build(data=images)
+    unfused = make_schema()
+    unfused.build(data=images, fused=False)
+    assert fused.to_jcr() == unfused.to_jcr()
+
+    # The data is only traversed once
+    schema = make_schema()
+    schema.build(data=(img for img in images))
+    assert schema.to_jcr() == fused.to_jcr()
+
+
+def test_build_workers():
+    fpaths = sorted((DATA_PATH / "castinginspection/ok_front").glob("*.jpeg"))[:10]
+    images = [Image.open(fpath) for fpath in fpaths]
+
+    def make_schema():
+        return Schema(
+            features=[
+                FloatFeature(name="sharpness", extractor=Sharpness()),
+                FloatFeature(name="intensity", extractor=AvgIntensity()),
+            ]
+        )
+
+    serial = make_schema()
+    serial.build(data=images)
+    parallel = make_schema()
+    parallel.build(data=images, workers=2)
+    assert parallel.to_jcr() == serial.to_jcr()
+
+    data = pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+    serial = Schema(features=construct_features(dtypes=data.dtypes))
+    serial.build(data=data)
+    parallel = Schema(features=construct_features(dtypes=data.dtypes))
+    parallel.build(data=data, workers=2)
+    assert parallel.to_jcr() == serial.to_jcr()
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"cache": object(), "sample_size": 100},
+        {"sample_size": 100, "chunked": True, "workers": 4},
+        {"parallel": True, "workers": 2},
+    ],
+)
+def test_build_options_exclusive(options):
+    data = pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+    schema = Schema(features=construct_features(dtypes=data.dtypes))
+    with pytest.raises(ValueError, match="Cannot combine"):
+        schema.build(data=data, **options)
+    assert not schema.is_built()
+
+
+def test_check_stream():
+    data = pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+    schema = Schema(features=construct_features(dtypes=data.dtypes))
+    schema.build(data=data.iloc[:500])
+
+    reports = []
+    rows = (row for _, row in data.iloc[500:750].iterrows())
+    stream = schema.check_stream(rows, chunk_size=100, progress=lambda p: reports.append((p.n_samples, p.n_chunks)))
+    assert reports == []  # Lazy
+    results = list(stream)
+    assert len(results) == 250
+    assert reports == [(100, 1), (200, 2), (250, 3)]
+    for (_, row), tags in zip(data.iloc[500:750].iterrows(), results):
+        assert tags == schema.check(row)
+
+    chunks = list(schema.check_stream(data.iloc[500:750].to_dict("records"), chunk_size=100, columnar=True))
+    assert [chunk.n_samples for chunk in chunks] == [100, 100, 50]
+
+
+def test_check_many():
+    data = pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+    schema = Schema(features=construct_features(dtypes=data.dtypes))
+    schema.build(data=data.iloc[:500])
+
+    test = data.iloc[500:700]
+    results = schema.check_many(test, workers=2, chunk_size=32)
+    assert results == schema.check_batch(test)
+    # DataFrames are checked in slices of rows
+    assert list(schema.check_stream(test, chunk_size=32)) == results
+
+
+class RowExtractor(ElementExtractor):
+    # Extracts row by row, like most custom extractors
+    def extract_batch(self, data):
+        return FeatureExtractor.extract_batch(self, data)
+
+
+def test_check_batch_shared_rows(monkeypatch):
+    data = pd.DataFrame({"a": np.arange(10.0), "b": np.arange(10.0) * 2})
+    schema = Schema(features=[FloatFeature(name=name, extractor=RowExtractor(element=name)) for name in data])
+    schema.build(data=data)
+    iterrows = pd.DataFrame.iterrows
+    calls = []
+
+    def counted(frame):
+        calls.append(len(frame))
+        return iterrows(frame)
+
+    monkeypatch.setattr(pd.DataFrame, "iterrows", counted)
+    batch_tags = schema.check_batch(data)
+    # Split in rows once for both features
+    assert calls == [10]
+    monkeypatch.undo()
+    for (_, row), tags in zip(data.iterrows(), batch_tags):
+        assert tags == schema.check(row)
+
+
+def test_instrumentation():
+    from rdv import instrumentation
+
+    data = pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+    schema = Schema(features=construct_features(dtypes=data.dtypes))
+    with instrumentation.instrumented() as timings:
+        schema.build(data=data.iloc[:500])
+        tags = schema.check(data.iloc[500])
+        schema.check_batch(data.iloc[500:600])
+    assert instrumentation.active is None
+    assert tags == schema.check(data.iloc[500])
+
+    summary = timings.summary().set_index(["feature", "stage"])
+    n_features = len(schema.features)
+    assert len(summary) == 5 * n_features
+    assert (summary.xs("build_stats", level="stage")["calls"] == 1).all()
+    assert (summary.xs("extract", level="stage")["calls"] == 2).all()
+    assert (summary.xs("extract", level="stage")["items"] == 101).all()
+    assert (summary["errors"] == 0).all()
+    assert (summary["p99"] >= summary["p50"]).all()
+
+    costs = timings.costs()
+    assert set(costs) == set(schema.features)
+    tags = schema.check(data.iloc[500], order=costs)
+    assert len(tags) == len(schema.check(data.iloc[500]))
+
+
+def test_likelihood():
+    stats = NumericStats()
+    stats.build(np.arange(1001.0))
+    assert np.allclose(stats.rank([-1, 10, 500, 2000]), [0, 0.01, 0.5, 1])
+    assert np.isnan(stats.rank([np.nan])[0])
+    lh = stats.likelihood([-1, 0, 500, 1000, 2000])
+    assert lh[0] == lh[-1] == 0
+    assert lh[2] == 1
+    assert 0 < lh[1] < 0.05 and 0 < lh[3] < 0.05
+
+    stats = CategoricStats()
+    stats.build(["a"] * 6 + ["b"] * 3 + ["c"] + [None])
+    lh = stats.likelihood(["a", "b", "c", "d", None])
+    assert np.allclose(lh[:4], [1, 0.4, 0.1, 0])
+    assert np.isnan(lh[4])
+
+
+def test_check_likelihood():
+    data = pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+    schema = Schema(name="houseprices", features=construct_features(dtypes=data.dtypes))
+    schema.build(data=data.iloc[:500])
+
+    checkdata = data.iloc[500:600]
+    batch_tags = schema.check_batch(checkdata, likelihood=True)
+    for (_, row), tags in zip(checkdata.iterrows(), batch_tags):
+        assert tags == schema.check(row, likelihood=True)
+        # Only likelihood tags are added
+        assert [tag for tag in tags if tag["type"] not in (SCHEMA_FEATURE_LH, SCHEMA_GLOBAL_LH)] == schema.check(row)
+        features = [tag["name"] for tag in tags if tag["type"] == SCHEMA_FEATURE]
+        assert [tag["name"] for tag in tags if tag["type"] == SCHEMA_FEATURE_LH] == features
+        assert all(0 <= tag["value"] <= 1 for tag in tags if tag["type"] == SCHEMA_FEATURE_LH)
+        assert tags[-1]["type"] == SCHEMA_GLOBAL_LH and tags[-1]["name"] == "houseprices"
+
+    # Unusual data is less likely
+    usual = data.iloc[[0]].copy()
+    numeric = usual.select_dtypes("number").columns
+    usual[numeric] = data.iloc[:500][numeric].median().values
+    unusual = usual.copy()
+    unusual[numeric] = unusual[numeric] * 10
+    lh = schema.check_batch(pd.concat([usual, unusual]), likelihood=True)
+    assert lh[0][-1]["value"] > lh[1][-1]["value"]
+
+    with pytest.raises(ValueError):
+        schema.check(data.iloc[0], columnar=True, likelihood=True)
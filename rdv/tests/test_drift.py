@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import chi2_contingency, ks_2samp, kstwo
+
+from rdv.drift import chi2_drift, ks_drift
+from rdv.globals import DataException, SchemaStateException
+from rdv.schema import Schema
+from rdv.stats import CategoricStats, NumericStats, drift_batch, equalize_domains
+
+
+def build_numeric(data):
+    stats = NumericStats()
+    stats.build(pd.Series(data))
+    return stats
+
+
+def build_categoric(data):
+    stats = CategoricStats()
+    stats.build(pd.Series(data))
+    return stats
+
+
+def test_ks_drift():
+    rng = np.random.default_rng(0)
+    a, b = rng.normal(size=5000), rng.normal(loc=0.1, size=3000)
+    q = np.arange(101)
+    stat, pvalue = ks_drift([np.percentile(a, q)], [np.percentile(b, q)], n_a=[len(a)], n_b=[len(b)])
+    expected = ks_2samp(a, b, method="asymp")
+    assert stat[0] == pytest.approx(expected.statistic, abs=0.01)
+    # The p-value allows for the CDFs being resolved to one percentile step only
+    assert pvalue[0] == pytest.approx(kstwo.sf(expected.statistic - 0.01, round(5000 * 3000 / 8000)), abs=0.02)
+    assert pvalue[0] > expected.pvalue
+    # Identical stats never drift
+    stat, pvalue = ks_drift([np.percentile(a, q)], [np.percentile(a, q)], n_a=[len(a)], n_b=[len(a)])
+    assert stat[0] == 0 and pvalue[0] == 1
+
+
+@pytest.mark.parametrize("draw", [lambda rng, n: rng.poisson(3, n), lambda rng, n: rng.normal(size=n)])
+def test_ks_drift_large_samples(draw):
+    rng = np.random.default_rng(0)
+    q = np.arange(101)
+    for n in [100_000, 1_000_000]:
+        same = [(np.percentile(draw(rng, n), q), np.percentile(draw(rng, n), q)) for _ in range(20)]
+        _, pvalue = ks_drift(*zip(*same), n_a=[n] * 20, n_b=[n] * 20)
+        # The grid error does not make samples of the same distribution drift
+        assert (pvalue < 0.05).mean() <= 0.05
+        shifted = np.percentile(draw(rng, n) + 0.1, q)
+        assert ks_drift(same[0][0], shifted, n_a=[n], n_b=[n])[1][0] < 1e-6
+
+
+def test_chi2_drift():
+    counts = np.array([[[30, 50, 20, 0], [40, 40, 20, 0]], [[10, 0, 0, 0], [8, 0, 0, 0]]])
+    stat, pvalue = chi2_drift(counts[:, 0], counts[:, 1])
+    expected = chi2_contingency(counts[0][:, :3], correction=False)
+    assert stat[0] == pytest.approx(expected[0])
+    assert pvalue[0] == pytest.approx(expected[1])
+    # A single domain value cannot drift
+    assert pvalue[1] == 1
+
+
+def test_drift_deterministic():
+    rng = np.random.default_rng(0)
+    reference = build_numeric(rng.normal(size=2000))
+    same = build_numeric(rng.normal(size=2000))
+    shifted = build_numeric(rng.normal(loc=0.5, size=2000))
+    assert reference.test_drift(shifted) == reference.test_drift(shifted)
+    assert not reference.test_drift(same)[2]
+    assert reference.test_drift(shifted)[2]
+    assert reference.test_drift(reference) == (0.0, 1.0, False)
+
+    categoric = build_categoric(rng.choice(["a", "b", "c"], p=[0.5, 0.3, 0.2], size=2000))
+    categoric_same = build_categoric(rng.choice(["a", "b", "c"], p=[0.5, 0.3, 0.2], size=2000))
+    categoric_shifted = build_categoric(rng.choice(["a", "b", "d"], p=[0.4, 0.3, 0.3], size=2000))
+    assert categoric.test_drift(categoric_shifted) == categoric.test_drift(categoric_shifted)
+    assert not categoric.test_drift(categoric_same)[2]
+    assert categoric.test_drift(categoric_shifted)[2]
+
+    # Testing many pairs at once gives the same results
+    pairs = [(reference, shifted), (categoric, categoric_shifted), (reference, same)]
+    stat, pvalue, drift = drift_batch(pairs)
+    for i, (a, b) in enumerate(pairs):
+        assert (stat[i], pvalue[i], drift[i]) == pytest.approx(a.test_drift(b))
+    with pytest.raises(DataException):
+        drift_batch([(reference, categoric)])
+
+
+def test_drift_serialized():
+    rng = np.random.default_rng(0)
+    reference = build_numeric(rng.normal(size=2000))
+    shifted = build_numeric(rng.normal(loc=0.2, size=2000))
+    restored = NumericStats.from_jcr(reference.to_jcr())
+    assert restored.samplesize == 2000
+    assert restored.test_drift(shifted) == reference.test_drift(shifted)
+
+
+def test_equalize_domains():
+    a, b = {"x": 0.5, "y": 0.5}, {"y": 0.2, "z": 0.8}
+    a_eq, b_eq, domain = equalize_domains(a, b)
+    assert domain == ["x", "y", "z"]
+    assert a_eq == {"x": 0.5, "y": 0.5, "z": 0}
+    assert b_eq == {"x": 0, "y": 0.2, "z": 0.8}
+    # The stats are not changed
+    assert a == {"x": 0.5, "y": 0.5} and b == {"y": 0.2, "z": 0.8}
+
+
+def make_frame(rng, loc=0.0, n=1000):
+    return pd.DataFrame(
+        {
+            "x": rng.normal(loc=loc, size=n),
+            "y": rng.exponential(size=n),
+            "c": rng.choice(["a", "b", "c"], p=[0.5, 0.3, 0.2], size=n),
+        }
+    )
+
+
+def test_drift_report():
+    rng = np.random.default_rng(0)
+    reference = Schema.from_dataframe(make_frame(rng))
+    same, shifted = Schema.from_dataframe(make_frame(rng)), Schema.from_dataframe(make_frame(rng, loc=1.0))
+
+    report = reference.drift_report(shifted)
+    assert list(report.columns) == ["feature", "statistic", "pvalue", "drift"]
+    assert list(report["feature"]) == ["x", "y", "c"]
+    assert list(report["drift"]) == [True, False, False]
+    for _, row in report.iterrows():
+        expected = reference.features[row["feature"]].stats.test_drift(shifted.features[row["feature"]].stats)
+        assert (row["statistic"], row["pvalue"], row["drift"]) == pytest.approx(expected)
+
+    # One reference against many candidates, in small chunks on the thread pool
+    many = reference.drift_report([same, shifted], parallel=True, chunk_size=2)
+    assert list(many["candidate"]) == [0, 0, 0, 1, 1, 1]
+    assert not many["drift"][many["candidate"] == 0].any()
+    pd.testing.assert_frame_equal(many[many["candidate"] == 1].drop(columns="candidate").reset_index(drop=True), report)
+
+    reference.drop_feature("y")
+    with pytest.raises(SchemaStateException):
+        shifted.drift_report(reference)
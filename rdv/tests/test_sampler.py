@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rdv.stats import CategoricStats, NumericStats, sample_batch
+
+
+def build(stats, data):
+    stats.build(pd.Series(data))
+    return stats
+
+
+def test_numeric_sample():
+    data = np.random.default_rng(0).normal(size=5000)
+    stats = build(NumericStats(), data)
+    samples = stats.sample(n=20000)
+    assert samples.min() >= stats.min and samples.max() <= stats.max
+    assert np.allclose(np.percentile(samples, [10, 50, 90]), np.percentile(data, [10, 50, 90]), atol=0.05)
+    # Successive draws continue the generator, a seed repeats a draw
+    assert not np.array_equal(stats.sample(n=10), stats.sample(n=10))
+    assert np.array_equal(stats.sample(n=10, seed=1), stats.sample(n=10, seed=1))
+    assert stats.sample(n=10, dtype="int").dtype.kind == "i"
+
+
+def test_samplers_independent():
+    data = np.random.default_rng(0).normal(size=1000)
+    first, second = build(NumericStats(), data), build(NumericStats(), data)
+    # Stats of the same data draw from independent streams, so their draws are not correlated
+    a, b = first.sample(n=5000), second.sample(n=5000)
+    assert abs(np.corrcoef(a, b)[0, 1]) < 0.1
+    categoric = CategoricStats(domain_counts={"a": 0.5, "b": 0.5}, pinv=0.0, samplesize=100)
+    other = CategoricStats(domain_counts={"a": 0.5, "b": 0.5}, pinv=0.0, samplesize=100)
+    assert not np.array_equal(categoric.sample(n=100), other.sample(n=100))
+
+
+def test_categoric_sample():
+    stats = CategoricStats(domain_counts={"b": 0.2, "a": 0.7, "c": 0.1}, pinv=0.0, samplesize=100)
+    counts = pd.Series(stats.sample(n=20000)).value_counts(normalize=True)
+    assert counts.to_dict() == pytest.approx({"a": 0.7, "b": 0.2, "c": 0.1}, abs=0.02)
+    # The order of the domain counts does not matter
+    reordered = CategoricStats(domain_counts={"c": 0.1, "a": 0.7, "b": 0.2}, pinv=0.0, samplesize=100)
+    assert np.array_equal(stats.sample(n=50, seed=3), reordered.sample(n=50, seed=3))
+
+
+def test_sampler_invalidated():
+    rng = np.random.default_rng(0)
+    stats = build(NumericStats(), rng.normal(size=1000))
+    sampler = stats.sampler
+    assert stats.sampler is sampler
+    build(stats, rng.normal(loc=100, size=1000))
+    assert stats.sampler is not sampler
+    assert stats.sample(n=100).min() > 90
+
+    categoric = build(CategoricStats(), ["a", "b"] * 10)
+    sampler = categoric.sampler
+    categoric.update(["c"] * 10)
+    assert categoric.sampler is not sampler
+    assert "c" in categoric.sample(n=100)
+
+
+def test_sample_batch():
+    rng = np.random.default_rng(0)
+    stats = [
+        build(NumericStats(), rng.normal(size=1000)),
+        build(CategoricStats(), rng.choice(["a", "b"], size=1000)),
+        build(NumericStats(), rng.exponential(size=1000)),
+    ]
+    samples = sample_batch(stats, n=500, seed=1)
+    assert [len(s) for s in samples] == [500, 500, 500]
+    assert set(samples[1]) == {"a", "b"}
+    assert samples[2].min() >= 0
+    for first, second in zip(samples, sample_batch(stats, n=500, seed=1)):
+        assert np.array_equal(first, second)
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from rdv.schema import Schema
+from rdv.sampling import reservoir_sample
+from rdv.stats import NumericStats
+from rdv.extractors.structured import construct_features
+
+DATA_PATH = Path(__file__).parents[2] / "examples/data_sample"
+
+
+def test_reservoir_sample():
+    visited = []
+    sample, n_seen = reservoir_sample(range(100000), k=1000, seed=1, visit=visited.append)
+    assert n_seen == 100000
+    assert len(visited) == 100000
+    assert len(set(sample)) == 1000
+    assert abs(np.mean(sample) - 50000) < 3000
+
+    sample, n_seen = reservoir_sample(range(10), k=1000)
+    assert sorted(sample) == list(range(10))
+    assert n_seen == 10
+
+
+def test_build_sampled():
+    data = pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+    full = Schema(features=construct_features(dtypes=data.dtypes))
+    full.build(data=data)
+
+    for sampled_data in [data, (row for _, row in data.iterrows())]:
+        schema = Schema(features=construct_features(dtypes=data.dtypes))
+        schema.build(data=sampled_data, sample_size=300, confidence=0.999)
+        assert schema.is_built()
+        for name, feat in schema.features.items():
+            stats, full_stats = feat.stats, full.features[name].stats
+            assert stats.bounds["n"] <= 300
+            if isinstance(stats, NumericStats):
+                # Scanned
+                assert stats.min == full_stats.min
+                assert stats.max == full_stats.max
+                assert np.all(np.array(stats.bounds["percentiles_lower"]) <= np.array(full_stats.percentiles) + 1e-9)
+                assert np.all(np.array(stats.bounds["percentiles_upper"]) >= np.array(full_stats.percentiles) - 1e-9)
+            else:
+                assert set(stats.domain_counts) == set(full_stats.domain_counts)
+                assert stats.bounds["unseen_mass"] == 0
@@ -4,6 +4,7 @@ from rdv.schema import Schema
 from rdv.feature import FloatFeature
 from rdv.stats import NumericStats, CategoricStats
 from rdv.extractors.vision.similarity import FixedSubpatchSimilarity
+from rdv.tags import Tag, SCHEMA_FEATURE
 
 
 def test_schema_jcr():
@@ -24,3 +25,13 @@ def test_schema_jcr():
     assert schema.name == schema_restored.name
     assert schema.version == schema_restored.version
     assert all([c1 == c2 for (c1, c2) in zip(schema.features.keys(), schema_restored.features.keys())])
+
+
+def test_tag_jcr():
+    tag = Tag(name="testcomponent", value=1.0, type=SCHEMA_FEATURE, group="Testing@1.0.0")
+    assert not hasattr(tag, "__dict__")
+    jcr = tag.to_jcr()
+    assert jcr == {"type": SCHEMA_FEATURE, "name": "testcomponent", "value": 1.0, "group": "Testing@1.0.0"}
+    restored = Tag.from_jcr(jcr)
+    assert restored.to_jcr() == jcr
+    assert restored.name is tag.name
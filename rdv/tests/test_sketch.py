@@ -0,0 +1,273 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rdv.schema import Schema
+from rdv.globals import DataException
+from rdv.sketch import CategoricSketch, NumericSketch, QuantileSketch, SlidingWindow
+from rdv.stats import CategoricStats, NumericStats, Stats
+from rdv.extractors.structured import construct_features
+from rdv.extractors.structured.kmeans import KMeansOutlierScorer
+from rdv.feature import FloatFeature
+
+DATA_PATH = Path(__file__).parents[2] / "examples/data_sample"
+Q = np.arange(start=0, stop=101, step=1)
+
+
+def rank_errors(sketch, data):
+    ranks = np.searchsorted(np.sort(data), sketch.percentiles(Q)) / len(data)
+    return np.abs(ranks - Q / 100)[1:-1]
+
+
+def assert_stats_close(result, expected):
+    assert result.keys() == expected.keys()
+    for attr in expected:
+        if isinstance(expected[attr], dict):
+            assert result[attr] == pytest.approx(expected[attr])
+        else:
+            assert np.allclose(result[attr], expected[attr])
+
+
+def test_quantile_sketch_exact():
+    data = np.random.default_rng(0).normal(size=500)
+    sketch = QuantileSketch(k=1024)
+    for chunk in np.array_split(data, 7):
+        sketch.update(chunk)
+    assert sketch.is_exact
+    assert np.allclose(sketch.percentiles(Q), np.percentile(data, Q))
+
+
+def test_quantile_sketch_accuracy():
+    data = np.random.default_rng(0).lognormal(size=200000)
+    k = 256
+    sketch = QuantileSketch(k=k)
+    for chunk in np.array_split(data, 50):
+        sketch.update(chunk)
+    assert len(sketch) < k * 12
+    # 2 / k + eps with eps = 8 / k, fails with a probability of 2 exp(-16) per percentile
+    assert rank_errors(sketch, data).max() < 10 / k
+
+    left, right = QuantileSketch(k=k), QuantileSketch(k=k, seed=1)
+    left.update(data[:50000])
+    right.update(data[50000:])
+    left.merge(right)
+    assert left.count == len(data)
+    assert rank_errors(left, data).max() < 10 / k
+
+
+def test_numeric_sketch():
+    data = np.random.default_rng(0).normal(size=10000)
+    data[::10] = np.nan
+    sketch, other = NumericSketch(), NumericSketch()
+    sketch.update(data[:3000])
+    other.update(data[3000:])
+    sketch.merge(other)
+    valid = data[~np.isnan(data)]
+    assert sketch.count == len(valid)
+    assert sketch.n_invalid == 1000
+    assert sketch.moments.mean == pytest.approx(valid.mean())
+    assert sketch.moments.std == pytest.approx(valid.std())
+    assert sketch.moments.min == valid.min()
+    assert sketch.moments.max == valid.max()
+
+
+def test_categoric_sketch():
+    data = pd.Series(["a", "b", None, "a", np.nan, "c"] * 10)
+    sketch = CategoricSketch()
+    for start in range(0, len(data), 25):
+        sketch.update(data.iloc[start : start + 25])
+    assert sketch.counts == {"a": 20, "b": 10, "c": 10}
+    assert sketch.n_invalid == 20
+    assert sketch.count == len(data)
+
+
+def test_build_chunked():
+    data = pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+    schema = Schema(features=construct_features(dtypes=data.dtypes))
+    schema.build(data=data)
+    chunked = Schema(features=construct_features(dtypes=data.dtypes))
+    chunked.build(data=(data.iloc[start : start + 100] for start in range(0, len(data), 100)), chunked=True)
+    assert chunked.is_built()
+
+    for name, feat in schema.features.items():
+        assert_stats_close(chunked.features[name].stats.to_jcr(), feat.stats.to_jcr())
+
+
+def test_merge(tmp_path):
+    data = pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+    full = Schema(features=construct_features(dtypes=data.dtypes))
+    full.build(data=data)
+    left = Schema(features=construct_features(dtypes=data.dtypes))
+    left.build(data=data.iloc[:400])
+    right = Schema(features=construct_features(dtypes=data.dtypes))
+    right.build(data=data.iloc[400:])
+
+    # Through JSON, with and without sketches
+    left.save(tmp_path / "left.json", include_sketch=True)
+    right.save(tmp_path / "right.json", include_sketch=True)
+    merged = Schema.load(tmp_path / "left.json").merge(Schema.load(tmp_path / "right.json"))
+    assert merged.is_built()
+    for name, feat in full.features.items():
+        assert_stats_close(merged.features[name].stats.to_jcr(), feat.stats.to_jcr())
+
+    right.save(tmp_path / "right.json")
+    loaded = Schema.load(tmp_path / "right.json")
+    cat_name = "MSZoning"
+    merged_feat = left.features[cat_name].merge(loaded.features[cat_name])
+    assert_stats_close(merged_feat.stats.to_jcr(), full.features[cat_name].stats.to_jcr())
+    # Numeric sketches are approximated from the percentiles
+    merged = left.merge(loaded)
+    for name, feat in full.features.items():
+        if isinstance(feat.stats, NumericStats):
+            assert_numeric_close(merged.features[name].stats, feat.stats, data[name].to_numpy(dtype=float))
+
+
+def assert_numeric_close(result, expected, data):
+    assert (result.min, result.max, result.samplesize) == (expected.min, expected.max, expected.samplesize)
+    assert (result.mean, result.std) == pytest.approx((expected.mean, expected.std))
+    # The percentiles are off by at most one percentile step in rank, tied values span a range of ranks
+    data = np.sort(data[~np.isnan(data)])
+    lo = np.searchsorted(data, result.percentiles, side="left") / len(data)
+    hi = np.searchsorted(data, result.percentiles, side="right") / len(data)
+    assert np.maximum(lo - Q / 100, Q / 100 - hi).max() <= 0.01
+
+
+def test_update_loaded(tmp_path):
+    data = pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+    full = Schema(features=construct_features(dtypes=data.dtypes))
+    full.build(data=data)
+    schema = Schema(features=construct_features(dtypes=data.dtypes))
+    schema.build(data=data.iloc[:600])
+    # Saved without sketches, the default
+    schema.save(tmp_path / "schema.json")
+    loaded = Schema.load(tmp_path / "schema.json")
+    loaded.update(data.iloc[600:])
+    for name, feat in full.features.items():
+        if isinstance(feat.stats, NumericStats):
+            assert_numeric_close(loaded.features[name].stats, feat.stats, data[name].to_numpy(dtype=float))
+        else:
+            assert_stats_close(loaded.features[name].stats.to_jcr(), feat.stats.to_jcr())
+
+
+def test_merge_built_extractors():
+    rng = np.random.default_rng(0)
+    data = list(rng.normal(size=(200, 3)))
+    left, right = FloatFeature("score", KMeansOutlierScorer(k=2)), FloatFeature("score", KMeansOutlierScorer(k=2))
+    left.build(data[:100])
+    right.build(data[100:])
+    # Clusters learned on each partition
+    with pytest.raises(DataException):
+        left.merge(right)
+    right.restore_extractor(left.extractor.to_jcr())
+    right.build_stats(data[100:])
+    assert left.merge(right).stats.samplesize == 200
+
+
+class ConstantStats(Stats):
+    # Stats written before stats were mergeable
+    def to_jcr(self):
+        return {}
+
+    @classmethod
+    def from_jcr(cls, jcr):
+        return cls()
+
+    def build(self, data):
+        pass
+
+    def is_built(self):
+        return True
+
+    def sample(self, n):
+        return np.zeros(n)
+
+    def test_drift(self, other):
+        return 0.0, 1.0, False
+
+
+def test_sketch_lazy():
+    data = np.random.default_rng(0).normal(size=5000)
+    data[::10] = np.nan
+    stats = NumericStats()
+    stats.build(pd.Series(data))
+    # Only built when needed
+    assert stats._sketch is None
+    expected = NumericSketch()
+    expected.update(data)
+    assert stats.get_sketch().to_jcr() == expected.to_jcr()
+    assert stats._sketch_values is None
+    columns = NumericStats.build_columns(np.stack([data, data], axis=1))
+    assert columns[1].get_sketch().to_jcr() == expected.to_jcr()
+
+
+def test_merge_unmergeable():
+    stats = ConstantStats()
+    with pytest.raises(DataException, match="not mergeable"):
+        stats.merge(ConstantStats())
+    with pytest.raises(DataException, match="not mergeable"):
+        stats.update([1.0])
+
+
+def test_update():
+    data = pd.read_csv(DATA_PATH / "houseprices/subset-cheap.csv").drop("Id", axis="columns")
+    batches = [data.iloc[:300], data.iloc[300:600], data.iloc[600:]]
+    schema = Schema(features=construct_features(dtypes=data.dtypes))
+    schema.build(data=batches[0])
+    for batch in batches[1:]:
+        schema.update(batch)
+    full = Schema(features=construct_features(dtypes=data.dtypes))
+    full.build(data=data)
+    for name, feat in full.features.items():
+        assert_stats_close(schema.features[name].stats.to_jcr(), feat.stats.to_jcr())
+
+    schema.build(data=batches[0])
+    for batch in batches[1:]:
+        schema.update(batch, window=2)
+    recent = Schema(features=construct_features(dtypes=data.dtypes))
+    recent.build(data=data.iloc[300:])
+    for name, feat in recent.features.items():
+        assert_stats_close(schema.features[name].stats.to_jcr(), feat.stats.to_jcr())
+
+
+def test_sliding_window(monkeypatch):
+    rng = np.random.default_rng(0)
+    batches = [rng.normal(loc=i, size=20) for i in range(30)]
+    sketches = []
+    for batch in batches:
+        sketch = NumericSketch()
+        sketch.update(batch)
+        sketches.append(sketch)
+    merges = []
+    merge = NumericSketch.merge
+
+    def counted(self, other):
+        merges.append(1)
+        return merge(self, other)
+
+    monkeypatch.setattr(NumericSketch, "merge", counted)
+    window = SlidingWindow(10)
+    for i, sketch in enumerate(sketches):
+        window.append(sketch)
+        merged = window.merged()
+        expected = np.concatenate(batches[max(0, i - 9) : i + 1])
+        assert merged.count == len(expected)
+        assert np.allclose(merged.percentiles(), np.percentile(expected, Q))
+    assert len(window) == 10
+    # A constant number of merges per update, not one per sketch in the window
+    assert len(merges) <= 3 * len(sketches)
+
+
+def test_update_decay():
+    stats = NumericStats()
+    stats.build(np.zeros(100))
+    stats.update(np.full(100, 10.0), decay=0.5)
+    assert stats.mean == pytest.approx(10 * 100 / 150)
+    assert stats.min == 0 and stats.max == 10
+    assert stats.samplesize == pytest.approx(150)
+
+    stats = CategoricStats()
+    stats.build(["a"] * 100)
+    stats.update(["b"] * 100, decay=0.75)
+    assert stats.domain_counts == pytest.approx({"b": 0.8, "a": 0.2})